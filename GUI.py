@@ -1,8 +1,18 @@
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
+import background_worker
 import controller
 
+# Number of habit rows fetched at once when the habit table is scrolled down
+TABLE_PAGE_SIZE = 100
+
+# Share of the habit table that has to be scrolled through before the next rows are fetched
+TABLE_PREFETCH_POSITION = 0.9
+
+# Number of pages the habit table holds at most, the rows of the page farthest from the visible rows are removed
+TABLE_MAX_PAGES = 3
+
 
 class Menu(tk.Tk):
 
@@ -56,8 +66,11 @@ class Menu(tk.Tk):
         self.back_to_analyze_menu_button = tk.Button(self, text="Back to data analysis menu",
                                                      command=self.analyze_click)
         # Habit Table
-        self.habit_table = ttk.Treeview(self, columns=("habit_name", "periodicity", "days_since_last_execution",
-                                                       "current_streak", "longest_streak", "number_of_breaks"))
+        # The table only contains the pages around the visible rows, further rows are fetched page by page
+        self.habit_table_frame = tk.Frame(self)
+        self.habit_table = ttk.Treeview(self.habit_table_frame,
+                                        columns=("habit_name", "periodicity", "days_since_last_execution",
+                                                 "current_streak", "longest_streak", "number_of_breaks"))
 
         # Defining column headings for habit table
         self.habit_table.heading("habit_name", text="Habit name")
@@ -67,6 +80,27 @@ class Menu(tk.Tk):
         self.habit_table.heading("longest_streak", text="Longest streak")
         self.habit_table.heading("number_of_breaks", text="Number of breaks")
 
+        # Scrollbar of the habit table, scrolling near the end of the table fetches the next rows
+        self.habit_table_scrollbar = ttk.Scrollbar(self.habit_table_frame, orient="vertical",
+                                                   command=self.habit_table.yview)
+        self.habit_table.configure(yscrollcommand=self.scroll_habit_table)
+        self.habit_table.pack(side="left")
+        self.habit_table_scrollbar.pack(side="right", fill="y")
+
+        # Query of the displayed habit table, the cursors of its pages and the range of pages in the table
+        # The cursor at index i is passed to controller.give_habit_page to fetch page i, None after the last page
+        self.habit_table_query = {}
+        self.habit_table_page_cursors = [None]
+        self.habit_table_first_page = 0
+        self.habit_table_last_page = -1
+        self.habit_table_loading = False
+
+        # Loading state of the habit table, the table data is loaded on a background worker
+        self.worker = background_worker.BackgroundWorker(self)
+        self.loading_label = tk.Label(self)
+        self.cancel_loading_button = tk.Button(self, text="Cancel", command=self.cancel_loading)
+        self.reload_button = tk.Button(self, text="Reload", command=self.reload_habit_table)
+
         # Packing widgets of main menu
         self.label.pack()
         self.button_create_habit.pack()
@@ -319,166 +353,226 @@ class Menu(tk.Tk):
         """
         Displays a habit table in the data analysis menu.
 
-        This method removes all existing widgets, deletes any potential rows from the habit table,
-        retrieves habit data from the controller module, and populates the habit table accordingly.
-
-        The habit table is populated by iterating over the retrieved habit data and inserting each row
-        into the table with the corresponding values.
-
-        After populating the habit table, the method packs the habit table widget along with the back buttons.
+        The habit table is populated by the "show_habit_page" method.
         """
-        # Removing all widgets
-        self.remove_all_widgets()
-
-        # Deleting all potentially existing rows from habit table
-        self.habit_table.delete(*self.habit_table.get_children())
-
-        # Adding data to the habit table
-        for i, row in enumerate(controller.give_habit_list_by_ID()):
-            self.habit_table.insert(parent='', index='end', iid=i, text=str(i + 1), values=row[1:])
-
-        # Packing the table + back buttons
-        self.habit_table.pack()
-        self.back_to_analyze_menu_button.pack()
-        self.button_back.pack()
+        self.show_habit_page()
 
     def show_habit_table_daily(self):
         """
         Displays a habit table of habits with periodicity "daily" in the data analysis menu.
 
-        This method removes all existing widgets, deletes any potential rows from the habit table,
-        retrieves habit data from the controller module, and populates the habit table accordingly.
-
-        The habit table is populated by iterating over the retrieved habit data and inserting each row
-        into the table with the corresponding values.
-
-        After populating the habit table, the method packs the habit table widget along with the back buttons.
+        The habit table is populated by the "show_habit_page" method.
         """
-        # Removing all widgets
-        self.remove_all_widgets()
-
-        # Deleting all potentially existing rows from habit table
-        self.habit_table.delete(*self.habit_table.get_children())
-
-        # Adding data to the habit table
-        for i, row in enumerate(controller.give_habit_list_daily()):
-            self.habit_table.insert(parent='', index='end', iid=i, text=str(i + 1), values=row[1:])
-
-        # Packing the table + back buttons
-        self.habit_table.pack()
-        self.back_to_analyze_menu_button.pack()
-        self.button_back.pack()
+        self.show_habit_page(periodicity="daily")
 
     def show_habit_table_weekly(self):
         """
         Displays a habit table of habits with periodicity "weekly" in the data analysis menu.
 
-        This method removes all existing widgets, deletes any potential rows from the habit table,
-        retrieves habit data from the controller module, and populates the habit table accordingly.
-
-        The habit table is populated by iterating over the retrieved habit data and inserting each row
-        into the table with the corresponding values.
-
-        After populating the habit table, the method packs the habit table widget along with the back buttons.
+        The habit table is populated by the "show_habit_page" method.
         """
-        # Removing all widgets
-        self.remove_all_widgets()
-
-        # Deleting all potentially existing rows from habit table
-        self.habit_table.delete(*self.habit_table.get_children())
-
-        # Adding data to the habit table
-        for i, row in enumerate(controller.give_habit_list_weekly()):
-            self.habit_table.insert(parent='', index='end', iid=i, text=str(i + 1), values=row[1:])
-
-        # Packing the table + back buttons
-        self.habit_table.pack()
-        self.back_to_analyze_menu_button.pack()
-        self.button_back.pack()
+        self.show_habit_page(periodicity="weekly")
 
     def show_habits_with_most_breaks(self):
         """
         Displays a habit table of all habits, sorted by break count in the data analysis menu in descending order.
 
-        This method removes all existing widgets, deletes any potential rows from the habit table,
-        retrieves habit data from the controller module, and populates the habit table accordingly.
-
-        The habit table is populated by iterating over the retrieved habit data and inserting each row
-        into the table with the corresponding values.
-
-        After populating the habit table, the method packs the habit table widget along with the back buttons.
+        The habit table is populated by the "show_habit_page" method.
         """
-        # Removing all widgets
-        self.remove_all_widgets()
-
-        # Deleting all potentially existing rows from habit table
-        self.habit_table.delete(*self.habit_table.get_children())
-
-        # Adding data to the habit table
-        for i, row in enumerate(controller.give_habit_list_by_break_count()):
-            self.habit_table.insert(parent='', index='end', iid=i, text=str(i + 1), values=row[1:])
-
-        # Packing the table + back buttons
-        self.habit_table.pack()
-        self.back_to_analyze_menu_button.pack()
-        self.button_back.pack()
+        self.show_habit_page(sort_key="NumberOfBreaks", descending=True)
 
     def show_habits_with_longest_current_streak(self):
         """
         Displays a habit table of all habits, sorted by current streak count in the data analysis menu in
         descending order.
 
-        This method removes all existing widgets, deletes any potential rows from the habit table,
-        retrieves habit data from the controller module, and populates the habit table accordingly.
-
-        The habit table is populated by iterating over the retrieved habit data and inserting each row
-        into the table with the corresponding values.
-
-        After populating the habit table, the method packs the habit table widget along with the back buttons.
+        The habit table is populated by the "show_habit_page" method.
         """
-        # Removing all widgets
-        self.remove_all_widgets()
-
-        # Deleting all potentially existing rows from habit table
-        self.habit_table.delete(*self.habit_table.get_children())
-
-        # Adding data to the habit table
-        for i, row in enumerate(controller.give_habit_list_by_current_streak()):
-            self.habit_table.insert(parent='', index='end', iid=i, text=str(i + 1), values=row[1:])
-
-        # Packing the table + back buttons
-        self.habit_table.pack()
-        self.back_to_analyze_menu_button.pack()
-        self.button_back.pack()
+        self.show_habit_page(sort_key="CurrentStreak", descending=True)
 
     def show_habits_with_longest_longest_streak(self):
         """
         Displays a habit table of all habits, sorted by the longest overall streak count in the data analysis menu in
         descending order.
 
-        This method removes all existing widgets, deletes any potential rows from the habit table,
-        retrieves habit data from the controller module, and populates the habit table accordingly.
+        The habit table is populated by the "show_habit_page" method.
+        """
+        self.show_habit_page(sort_key="LongestStreak", descending=True)
+
+    def show_habit_page(self, periodicity=None, sort_key="HabitName", descending=False):
+        """
+        Displays a habit table in the data analysis menu, filtered and sorted as requested.
+
+        This method removes all existing widgets, deletes any potential rows from the habit table and
+        requests the first page of habit data from the controller module. The request runs on the background worker,
+        which also recalculates outdated habit statistics, while the table shows a loading state that can be
+        cancelled. Further rows are only retrieved when the table is scrolled (see "scroll_habit_table"), and at most
+        TABLE_MAX_PAGES pages are kept in the table, so that it is displayed immediately and stays responsive
+        regardless of the number of habits.
 
-        The habit table is populated by iterating over the retrieved habit data and inserting each row
-        into the table with the corresponding values.
+        Requesting another table while a request is outstanding supersedes the outstanding request.
 
-        After populating the habit table, the method packs the habit table widget along with the back buttons.
+        Args:
+            periodicity (str, optional): Only display habits with this periodicity, defaults to all habits.
+            sort_key (str, optional): The column to sort by, see controller.give_habit_page. Defaults to "HabitName".
+            descending (bool, optional): Whether to sort in descending order. Defaults to False.
         """
         # Removing all widgets
         self.remove_all_widgets()
 
         # Deleting all potentially existing rows from habit table
         self.habit_table.delete(*self.habit_table.get_children())
-
-        # Adding data to the habit table
-        for i, row in enumerate(controller.give_habit_list_by_longest_streak()):
-            self.habit_table.insert(parent='', index='end', iid=i, text=str(i + 1), values=row[1:])
+        self.habit_table.yview_moveto(0)
 
         # Packing the table + back buttons
-        self.habit_table.pack()
+        self.habit_table_frame.pack()
         self.back_to_analyze_menu_button.pack()
         self.button_back.pack()
 
+        # Requesting the first page of data for the habit table
+        self.habit_table_query = {"periodicity": periodicity, "sort_key": sort_key, "descending": descending}
+        self.habit_table_page_cursors = [None]
+        self.habit_table_first_page = 0
+        self.habit_table_last_page = -1
+        self.load_habit_page(0)
+
+    def load_habit_page(self, page_number):
+        """
+        Requests a page of habit data of the displayed habit table from the controller module on the background
+        worker and shows the loading state until it is displayed by "display_habit_page".
+
+        Outdated habit statistics are only recalculated before the first page of a new table. Pages that are fetched
+        while scrolling, including pages that were removed from the table and are fetched again, use the statistics
+        the table started with, so that the page cursors stay valid.
+
+        Args:
+            page_number (int): The number of the page, starting at 0. Its cursor has to be known already.
+        """
+        self.habit_table_loading = True
+        self.worker.submit("habit_table", controller.give_habit_page, limit=TABLE_PAGE_SIZE,
+                           after=self.habit_table_page_cursors[page_number],
+                           refresh=self.habit_table_last_page < 0, **self.habit_table_query,
+                           callback=lambda habit_page: self.display_habit_page(page_number, habit_page),
+                           error_callback=self.display_loading_error)
+
+        # Showing the loading state below the table
+        self.reload_button.pack_forget()
+        self.loading_label.configure(text="Loading habits ...")
+        self.loading_label.pack(after=self.habit_table_frame)
+        self.cancel_loading_button.pack(after=self.loading_label)
+
+    def display_habit_page(self, page_number, habit_page):
+        """
+        Adds the rows of a page of habit data to the habit table and removes the loading state.
+
+        The page is appended if it follows the pages in the table and prepended if it precedes them. If the table then
+        holds more than TABLE_MAX_PAGES pages, the page at the other end is removed. The visible rows stay in place.
+
+        Args:
+            page_number (int): The number of the page, starting at 0.
+            habit_page (tuple): The habit rows and the cursor of the next page, as returned by
+                controller.give_habit_page.
+        """
+        habit_rows, next_page = habit_page
+        self.habit_table_loading = False
+        self.loading_label.pack_forget()
+        self.cancel_loading_button.pack_forget()
+        if page_number == len(self.habit_table_page_cursors) - 1:
+            self.habit_table_page_cursors.append(next_page)
+
+        # Remembering the first visible row, counted from the first row in the table
+        row_count = len(self.habit_table.get_children())
+        first_visible_row = self.habit_table.yview()[0] * row_count
+
+        # Adding data to the habit table, the row IDs count the rows of all pages
+        prepend = page_number < self.habit_table_first_page
+        if prepend:
+            self.habit_table_first_page = page_number
+            first_visible_row += len(habit_rows)
+        else:
+            self.habit_table_last_page = page_number
+        for i, row in enumerate(habit_rows):
+            row_number = page_number * TABLE_PAGE_SIZE + i
+            self.habit_table.insert(parent='', index=i if prepend else 'end', iid=row_number,
+                                    text=str(row_number + 1), values=row[1:])
+
+        # Removing the page at the other end of the table
+        if self.habit_table_last_page - self.habit_table_first_page >= TABLE_MAX_PAGES:
+            if prepend:
+                removed_page = self.habit_table_last_page
+                self.habit_table_last_page -= 1
+            else:
+                removed_page = self.habit_table_first_page
+                self.habit_table_first_page += 1
+            removed_rows = [iid for iid in self.habit_table.get_children()
+                            if int(iid) // TABLE_PAGE_SIZE == removed_page]
+            self.habit_table.delete(*removed_rows)
+            if not prepend:
+                first_visible_row -= len(removed_rows)
+
+        # Keeping the rows visible that were visible before
+        row_count = len(self.habit_table.get_children())
+        if row_count:
+            self.habit_table.yview_moveto(max(first_visible_row, 0) / row_count)
+
+    def display_loading_error(self, exception):
+        """
+        Removes the loading state and informs the user that the habit data could not be loaded.
+
+        Args:
+            exception (Exception): The exception raised while loading the habit data.
+        """
+        self.habit_table_loading = False
+        self.cancel_loading_button.pack_forget()
+        self.loading_label.configure(text=f"Habits could not be loaded: {exception}")
+        if self.habit_table_last_page < 0:
+            self.reload_button.pack(after=self.loading_label)
+
+    def cancel_loading(self):
+        """
+        This method is triggered when the cancel button is clicked while habit data is loading.
+        It cancels the outstanding request and removes the loading state. Scrolling requests further rows again. If
+        the first page was cancelled, the table is empty and a reload button requests it again.
+
+        A request that is already running, e.g. the recalculation of outdated statistics, is not interrupted: it
+        finishes on the background worker and only its result is discarded (see background_worker.BackgroundJob).
+        Completions made meanwhile do not wait for it, since the statistics are calculated outside the write
+        transaction (see database.update_database).
+        """
+        self.worker.cancel("habit_table")
+        self.habit_table_loading = False
+        self.cancel_loading_button.pack_forget()
+        self.loading_label.configure(text="Loading cancelled.")
+        if self.habit_table_last_page < 0:
+            self.reload_button.pack(after=self.loading_label)
+
+    def reload_habit_table(self):
+        """
+        This method is triggered when the reload button is clicked after loading the first page of the habit table
+        was cancelled or failed. It requests the first page again, including the recalculation of outdated statistics.
+        """
+        self.load_habit_page(0)
+
+    def scroll_habit_table(self, first, last):
+        """
+        Updates the scrollbar of the habit table whenever the visible part of the table changes.
+        If the table is scrolled close to its end and there are further habits, their next page is requested. If it
+        is scrolled close to its start and earlier pages were removed, the previous page is requested again.
+
+        Args:
+            first (str): The position of the first visible row, as a fraction of the table.
+            last (str): The position of the last visible row, as a fraction of the table.
+        """
+        self.habit_table_scrollbar.set(first, last)
+        if self.habit_table_loading:
+            return
+        next_page = self.habit_table_last_page + 1
+        if float(last) >= TABLE_PREFETCH_POSITION and next_page < len(self.habit_table_page_cursors) \
+                and self.habit_table_page_cursors[next_page] is not None:
+            self.load_habit_page(next_page)
+        elif float(first) <= 1 - TABLE_PREFETCH_POSITION and self.habit_table_first_page > 0:
+            self.load_habit_page(self.habit_table_first_page - 1)
+
     ### General methods
     def back_click(self):
         """
@@ -499,10 +593,20 @@ class Menu(tk.Tk):
         self.button_analyze_habits.pack()
         self.button_exit.pack()
 
+    def destroy(self):
+        """
+        Stops the background worker before the window is destroyed.
+        """
+        self.worker.shutdown()
+        super().destroy()
+
     def remove_all_widgets(self):
         """
-        This method unpacks all existing widgets currently displayed.
+        This method unpacks all existing widgets currently displayed. A habit page that is still loading is
+        cancelled, since its result or error could no longer be displayed.
         """
+        self.worker.cancel("habit_table")
+        self.habit_table_loading = False
         for widget in self.winfo_children():
             widget.pack_forget()
 
@@ -0,0 +1,244 @@
+import bisect
+import calendar
+import datetime
+
+# Executions are stored as seconds since 1970-01-01, day counts are obtained by integer division
+SECONDS_PER_DAY = 86400
+
+# Executions are also rolled up per ISO week (Monday to Sunday). 1970-01-01 was a Thursday, so the number of the week
+# of a timestamp is (timestamp + WEEK_OFFSET) // SECONDS_PER_WEEK.
+SECONDS_PER_WEEK = 7 * SECONDS_PER_DAY
+WEEK_OFFSET = 3 * SECONDS_PER_DAY
+
+
+def datetime_to_timestamp(date_time):
+    """
+    Converts a datetime into the integer timestamp stored in HabitExecution.Timestamp.
+
+    The stored datetimes are local times without a time zone. They are converted as if they were UTC, which is what
+    SQLite's strftime('%s', ...) does as well, so the difference of two timestamps is exactly the difference of the
+    two datetimes.
+
+    Args:
+        date_time (datetime): The datetime to convert.
+
+    Returns:
+        int: The number of seconds between 1970-01-01 00:00:00 and the given datetime.
+    """
+    return calendar.timegm(date_time.timetuple())
+
+
+def timestamp_to_datetime(timestamp):
+    """
+    Converts an integer timestamp as stored in HabitExecution.Timestamp back into a datetime.
+
+    Args:
+        timestamp (int): The number of seconds since 1970-01-01 00:00:00.
+
+    Returns:
+        datetime: The corresponding datetime.
+    """
+    return datetime.datetime(1970, 1, 1) + datetime.timedelta(seconds=timestamp)
+
+
+def get_streak_limit(periodicity):
+    """
+    Returns the maximum number of full days that may pass between two executions of a habit without breaking its
+    streak.
+
+    Args:
+        periodicity (str): The periodicity of the habit ("daily" or "weekly").
+
+    Returns:
+        int: 1 for daily habits, 7 for weekly habits.
+    """
+    if periodicity == "daily":
+        return 1
+    else:
+        return 7  # Periodicity is weekly
+
+
+def calculate_habit_statistics(periodicity, timestamps, now=None):
+    """
+    Calculates all statistics of a habit in a single pass over its execution history.
+
+    The execution timestamps have to be given in ascending order. Each timestamp is looked at exactly once, so the
+    history can be streamed directly from a database cursor, and all gaps are obtained by integer subtraction. The
+    results are identical to the ones of sql_get_latest_streak, sql_get_longest_streak, sql_get_days_since_completion
+    and sql_get_number_of_breaks in the database module.
+
+    Args:
+        periodicity (str): The periodicity of the habit ("daily" or "weekly").
+        timestamps (iterable): The execution timestamps of the habit (see datetime_to_timestamp), in ascending order.
+        now (int, optional): The timestamp the statistics are calculated for, defaults to the current time.
+
+    Returns:
+        tuple: A tuple containing the following elements:
+            - total_execution_count (int): The total number of executions of the habit.
+            - days_since_last_completion (int or None): The number of full days since the latest execution, None if
+              the habit has never been executed.
+            - current_streak (int): The length of the streak ending with the latest execution, 0 if it has expired.
+            - longest_streak (int): The length of the longest streak of the habit.
+            - number_of_breaks (int): The number of breaks in the execution history.
+            - last_completion (int or None): The timestamp of the latest execution, None if the habit has never
+              been executed.
+    """
+    if now is None:
+        now = datetime_to_timestamp(datetime.datetime.now())
+    limit = get_streak_limit(periodicity)
+
+    # A gap breaks the streak once it spans more than limit full days
+    break_gap = (limit + 1) * SECONDS_PER_DAY
+
+    total_execution_count = 0
+    streak = 0
+    longest_streak = 0
+    number_of_breaks = 0
+    previous_timestamp = None
+
+    for timestamp in timestamps:
+        total_execution_count += 1
+        if previous_timestamp is not None and timestamp - previous_timestamp >= break_gap:
+            number_of_breaks += 1
+            streak = 1
+        else:
+            streak += 1
+        if streak > longest_streak:
+            longest_streak = streak
+        previous_timestamp = timestamp
+
+    # The streak of the latest execution only counts as current if it has not expired yet
+    if previous_timestamp is None:
+        return 0, None, 0, 0, 0, None
+    days_since_last_completion = (now - previous_timestamp) // SECONDS_PER_DAY
+    if days_since_last_completion <= limit:
+        current_streak = streak
+    else:
+        current_streak = 0
+
+    return total_execution_count, days_since_last_completion, current_streak, longest_streak, number_of_breaks, \
+        previous_timestamp
+
+
+def calculate_habit_statistics_from_rollups(periodicity, periods, now=None):
+    """
+    Calculates all statistics of a habit from its execution rollups instead of its single executions.
+
+    A rollup summarizes the executions of a habit within one period, e.g. an ISO week in HabitExecutionWeekly, by
+    their number and their first and last timestamp. No gap within a period can break a streak as long as the period
+    is shorter than the streak limit plus one day, which holds for the weekly rollups of weekly habits. The only gaps
+    that matter are then the ones between the last execution of a period and the first execution of the next one, so
+    the results are identical to the ones of calculate_habit_statistics.
+
+    Args:
+        periodicity (str): The periodicity of the habit ("daily" or "weekly").
+        periods (iterable): (execution count, first timestamp, last timestamp) tuples of the periods with executions,
+            in ascending order.
+        now (int, optional): The timestamp the statistics are calculated for, defaults to the current time.
+
+    Returns:
+        tuple: The same statistics as calculate_habit_statistics.
+    """
+    if now is None:
+        now = datetime_to_timestamp(datetime.datetime.now())
+    limit = get_streak_limit(periodicity)
+
+    # A gap breaks the streak once it spans more than limit full days
+    break_gap = (limit + 1) * SECONDS_PER_DAY
+
+    total_execution_count = 0
+    streak = 0
+    longest_streak = 0
+    number_of_breaks = 0
+    previous_timestamp = None
+
+    for execution_count, first_timestamp, last_timestamp in periods:
+        total_execution_count += execution_count
+        if previous_timestamp is not None and first_timestamp - previous_timestamp >= break_gap:
+            number_of_breaks += 1
+            streak = execution_count
+        else:
+            streak += execution_count
+        if streak > longest_streak:
+            longest_streak = streak
+        previous_timestamp = last_timestamp
+
+    # The streak of the latest execution only counts as current if it has not expired yet
+    if previous_timestamp is None:
+        return 0, None, 0, 0, 0, None
+    days_since_last_completion = (now - previous_timestamp) // SECONDS_PER_DAY
+    if days_since_last_completion <= limit:
+        current_streak = streak
+    else:
+        current_streak = 0
+
+    return total_execution_count, days_since_last_completion, current_streak, longest_streak, number_of_breaks, \
+        previous_timestamp
+
+
+def advance_habit_statistics(periodicity, current_streak, longest_streak, number_of_breaks, previous_completion,
+                             new_completion):
+    """
+    Updates the streak statistics of a habit for a single new execution, without looking at its execution history.
+
+    The stored statistics have to reflect all executions up to and including previous_completion, and new_completion
+    has to be later than previous_completion. The results are identical to recalculating the statistics with
+    calculate_habit_statistics after the new execution was added.
+
+    Args:
+        periodicity (str): The periodicity of the habit ("daily" or "weekly").
+        current_streak (int): The current streak of the habit before the new execution.
+        longest_streak (int): The longest streak of the habit before the new execution.
+        number_of_breaks (int): The number of breaks of the habit before the new execution.
+        previous_completion (int or None): The timestamp of the latest execution before the new one, None if there
+            is none.
+        new_completion (int): The timestamp of the new execution.
+
+    Returns:
+        tuple: The updated current streak, longest streak and number of breaks of the habit.
+    """
+    if previous_completion is None:
+        current_streak = 1
+    elif (new_completion - previous_completion) // SECONDS_PER_DAY > get_streak_limit(periodicity):
+        current_streak = 1
+        number_of_breaks += 1
+    else:
+        # A streak that has not expired at new_completion had not expired when it was stored either
+        current_streak += 1
+
+    if current_streak > longest_streak:
+        longest_streak = current_streak
+
+    return current_streak, longest_streak, number_of_breaks
+
+
+def select_valid_completions(existing_timestamps, new_timestamps):
+    """
+    Applies the once-per-day rule of habit completions to a batch of new completions of a single habit: a completion
+    is only valid if no other execution of the habit lies less than a day before or after it.
+
+    New completions are checked in chronological order against the existing executions and against the new
+    completions accepted before them.
+
+    Args:
+        existing_timestamps (list): The timestamps of the existing executions of the habit in ascending order. Only
+            executions within a day of the new completions matter.
+        new_timestamps (list): The timestamps of the new completions, in any order.
+
+    Returns:
+        tuple: The list of accepted timestamps in ascending order and the list of rejected timestamps.
+    """
+    accepted = []
+    rejected = []
+    for timestamp in sorted(new_timestamps):
+        # Finding the closest existing executions before and after the new completion
+        position = bisect.bisect_left(existing_timestamps, timestamp)
+        too_close = (position < len(existing_timestamps)
+                     and existing_timestamps[position] - timestamp < SECONDS_PER_DAY) \
+            or (position > 0 and timestamp - existing_timestamps[position - 1] < SECONDS_PER_DAY) \
+            or (accepted and timestamp - accepted[-1] < SECONDS_PER_DAY)
+        if too_close:
+            rejected.append(timestamp)
+        else:
+            accepted.append(timestamp)
+    return accepted, rejected
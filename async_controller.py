@@ -0,0 +1,220 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import os
+import threading
+import controller
+
+# Maximum number of threads running database work for the async API. Every thread keeps its own connection
+# (see connection_manager.get_connection), so readers run concurrently under WAL while writers are serialized by SQLite.
+ASYNC_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+# Executor shared by all event loops, created on first use
+executor = None
+executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Returns the bounded thread pool that runs the database work of the async API, creating it on first use.
+
+    Returns:
+        concurrent.futures.ThreadPoolExecutor: The shared executor.
+    """
+    global executor
+    with executor_lock:
+        if executor is None:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=ASYNC_WORKERS,
+                                                             thread_name_prefix="AsyncDatabase")
+        return executor
+
+
+def shutdown_executor():
+    """
+    Stops the thread pool of the async API after the outstanding calls have finished. The next call creates a new one.
+
+    Returns:
+        None
+    """
+    global executor
+    with executor_lock:
+        if executor is not None:
+            executor.shutdown(wait=True)
+            executor = None
+
+
+async def run_blocking(function, *args, **kwargs):
+    """
+    Runs a blocking function on the thread pool of the async API without blocking the event loop.
+
+    The function runs in a copy of the current context, so that e.g. connection_manager.using_database applies.
+
+    Args:
+        function (callable): The blocking function.
+        *args: The positional arguments of the function.
+        **kwargs: The keyword arguments of the function.
+
+    Returns:
+        The result of the function.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), functools.partial(context.run, function, *args, **kwargs))
+
+
+# Creating habits
+async def create_daily_habit(name):
+    """
+    Creates a daily habit, see controller.create_daily_habit.
+
+    Args:
+        name (str): The name of the habit to be created.
+
+    Returns:
+        bool: True if the habit already exists in the database, False otherwise.
+    """
+    return await run_blocking(controller.create_daily_habit, name)
+
+
+async def create_weekly_habit(name):
+    """
+    Creates a weekly habit, see controller.create_weekly_habit.
+
+    Args:
+        name (str): The name of the habit to be created.
+
+    Returns:
+        bool: True if the habit already exists in the database, False otherwise.
+    """
+    return await run_blocking(controller.create_weekly_habit, name)
+
+
+# Completing and deleting habits
+async def complete_habit(name):
+    """
+    Marks a habit as completed for today, see controller.complete_habit.
+
+    Args:
+        name (str): The name of the habit to be marked as completed.
+
+    Returns:
+        bool: True if the habit was successfully marked as completed, False if it had already been completed today.
+    """
+    return await run_blocking(controller.complete_habit, name)
+
+
+async def complete_habits(completions):
+    """
+    Records a batch of habit completions, see controller.complete_habits.
+
+    Args:
+        completions (iterable): (habit name, completion time) pairs, the completion time as datetime or timestamp.
+
+    Returns:
+        tuple: The number of recorded completions and the list of rejected (habit name, completion time) pairs.
+    """
+    return await run_blocking(controller.complete_habits, list(completions))
+
+
+async def delete_habit(name):
+    """
+    Deletes a habit and its executions, see controller.delete_habit.
+
+    Args:
+        name (str): The name of the habit to be deleted.
+
+    Returns:
+        None
+    """
+    return await run_blocking(controller.delete_habit, name)
+
+
+# Listing and analysing habits
+async def get_habit_list():
+    """
+    Retrieves the names of all habits, see controller.get_habit_list.
+
+    Returns:
+        list: A list of all habit names in the habit tracker database.
+    """
+    return await run_blocking(controller.get_habit_list)
+
+
+async def give_habit_page(periodicity=None, sort_key="HabitName", descending=False, limit=None, after=None,
+                          refresh=None):
+    """
+    Retrieves one page of habit data, see controller.give_habit_page.
+
+    Args:
+        periodicity (str, optional): Only return habits with this periodicity, defaults to all.
+        sort_key (str, optional): The column to sort by. Defaults to "HabitName".
+        descending (bool, optional): Whether to sort in descending order. Defaults to False.
+        limit (int, optional): The maximum number of rows to return, defaults to all remaining rows.
+        after (tuple, optional): The cursor returned with the previous page.
+        refresh (bool, optional): Whether to update the data of changed habits first, defaults to the first page only.
+
+    Returns:
+        tuple: The list of habit rows and the cursor of the next page, which is None if there are no more rows.
+    """
+    return await run_blocking(controller.give_habit_page, periodicity, sort_key, descending, limit, after, refresh)
+
+
+async def give_habit_list_by_ID():
+    """
+    Retrieves all habits sorted by name, see controller.give_habit_list_by_ID.
+
+    Returns:
+        list: The habit rows.
+    """
+    return await run_blocking(controller.give_habit_list_by_ID)
+
+
+async def give_habit_list_daily():
+    """
+    Retrieves all daily habits, see controller.give_habit_list_daily.
+
+    Returns:
+        list: The habit rows.
+    """
+    return await run_blocking(controller.give_habit_list_daily)
+
+
+async def give_habit_list_weekly():
+    """
+    Retrieves all weekly habits, see controller.give_habit_list_weekly.
+
+    Returns:
+        list: The habit rows.
+    """
+    return await run_blocking(controller.give_habit_list_weekly)
+
+
+async def give_habit_list_by_break_count():
+    """
+    Retrieves all habits sorted by the number of breaks, see controller.give_habit_list_by_break_count.
+
+    Returns:
+        list: The habit rows.
+    """
+    return await run_blocking(controller.give_habit_list_by_break_count)
+
+
+async def give_habit_list_by_current_streak():
+    """
+    Retrieves all habits sorted by the current streak, see controller.give_habit_list_by_current_streak.
+
+    Returns:
+        list: The habit rows.
+    """
+    return await run_blocking(controller.give_habit_list_by_current_streak)
+
+
+async def give_habit_list_by_longest_streak():
+    """
+    Retrieves all habits sorted by the longest streak, see controller.give_habit_list_by_longest_streak.
+
+    Returns:
+        list: The habit rows.
+    """
+    return await run_blocking(controller.give_habit_list_by_longest_streak)
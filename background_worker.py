@@ -0,0 +1,149 @@
+import concurrent.futures
+import contextvars
+import queue
+
+# Milliseconds between two checks for finished jobs while jobs are outstanding
+POLL_INTERVAL = 50
+
+
+class BackgroundJob:
+    """
+    A call that runs on the thread of a BackgroundWorker, together with the callbacks that receive its outcome on the
+    Tk thread.
+    """
+
+    def __init__(self, key, function, args, kwargs, callback, error_callback):
+        self.key = key
+        self.call = (function, args, kwargs)
+        self.callback = callback
+        self.error_callback = error_callback
+        self.future = None
+        self.cancelled = False
+
+    def cancel(self):
+        """
+        Cancels the job. A job that has not started yet is not run at all, the outcome of a running job is discarded.
+        """
+        self.cancelled = True
+        if self.future is not None:
+            self.future.cancel()
+
+
+class BackgroundWorker:
+    """
+    Runs slow controller calls, e.g. the recalculation of the habit statistics, off the Tk thread and passes their
+    results back to the Tk thread.
+
+    Jobs run one after another on a single worker thread, which uses its own database connection
+    (see connection_manager.get_connection). Finished jobs are collected in a queue that the Tk thread polls with
+    after() callbacks, since Tk widgets may only be accessed from the Tk thread.
+
+    Every job has a key. Submitting a job with the key of an outstanding job coalesces the two: an identical call only
+    replaces the callbacks, a different call supersedes the outstanding one, whose outcome is then discarded.
+    """
+
+    def __init__(self, root, max_workers=1):
+        """
+        Args:
+            root (tkinter.Tk): The Tk root whose after() is used to deliver the results.
+            max_workers (int, optional): The number of worker threads. Defaults to 1, which runs all database work in
+                submission order.
+        """
+        self.root = root
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                                              thread_name_prefix="BackgroundWorker")
+        self.finished_jobs = queue.Queue()
+        self.jobs = {}
+        self.polling = False
+
+    def submit(self, key, function, *args, callback=None, error_callback=None, **kwargs):
+        """
+        Runs function(*args, **kwargs) on the worker thread.
+
+        Args:
+            key (str): The key used to coalesce duplicate and superseded jobs, e.g. the name of the view.
+            function (callable): The function to run.
+            *args: The positional arguments of the function.
+            callback (callable, optional): Called on the Tk thread with the result of the function.
+            error_callback (callable, optional): Called on the Tk thread with the exception raised by the function.
+            **kwargs: The keyword arguments of the function.
+
+        Returns:
+            BackgroundJob: The job that will deliver the result.
+        """
+        # Coalescing the job with an outstanding job of the same key
+        outstanding_job = self.jobs.get(key)
+        if outstanding_job is not None:
+            if outstanding_job.call == (function, args, kwargs):
+                outstanding_job.callback = callback
+                outstanding_job.error_callback = error_callback
+                return outstanding_job
+            outstanding_job.cancel()
+
+        job = BackgroundJob(key, function, args, kwargs, callback, error_callback)
+        self.jobs[key] = job
+
+        # Running the job in a copy of the current context, so that e.g. connection_manager.using_database applies
+        context = contextvars.copy_context()
+        job.future = self.executor.submit(context.run, function, *args, **kwargs)
+        job.future.add_done_callback(lambda future: self.finished_jobs.put(job))
+
+        # Starting to poll for finished jobs
+        if not self.polling:
+            self.polling = True
+            self.root.after(POLL_INTERVAL, self.poll)
+        return job
+
+    def cancel(self, key=None):
+        """
+        Cancels the outstanding job with the given key. A job that is already running is not interrupted, it runs to
+        completion on the worker thread and only its outcome is discarded.
+
+        Args:
+            key (str, optional): The key of the job to cancel, defaults to cancelling all outstanding jobs.
+
+        Returns:
+            None
+        """
+        for job_key in list(self.jobs):
+            if key is None or job_key == key:
+                self.jobs.pop(job_key).cancel()
+
+    def poll(self):
+        """
+        Delivers the outcome of all finished jobs on the Tk thread and schedules the next check while jobs are
+        outstanding.
+
+        Returns:
+            None
+        """
+        while True:
+            try:
+                job = self.finished_jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job.cancelled:
+                continue
+            if self.jobs.get(job.key) is job:
+                del self.jobs[job.key]
+            exception = job.future.exception()
+            if exception is not None:
+                if job.error_callback is not None:
+                    job.error_callback(exception)
+            elif job.callback is not None:
+                job.callback(job.future.result())
+
+        if self.jobs:
+            self.root.after(POLL_INTERVAL, self.poll)
+        else:
+            self.polling = False
+
+    def shutdown(self):
+        """
+        Cancels all outstanding jobs and stops the worker thread once the running job has finished.
+
+        Returns:
+            None
+        """
+        self.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
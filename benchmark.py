@@ -0,0 +1,205 @@
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import sqlite3 as sql
+import statistics
+import tempfile
+import time
+import connection_manager
+import controller
+import database
+import dataset_generator
+
+# Database sizes benchmarked by default: (number of habits, years of execution history)
+DEFAULT_SIZES = [(10, 1), (100, 1), (1000, 1), (1000, 5)]
+
+
+def time_call(function, repeat, setup=None):
+    """
+    Times repeated calls of a function.
+
+    Args:
+        function (callable): The function to time. It receives the number of the repetition (starting at 0).
+        repeat (int): The number of calls.
+        setup (callable, optional): Called with the number of the repetition before every call, not timed.
+
+    Returns:
+        dict: The minimum, median and mean duration of the calls in seconds, and the number of calls.
+    """
+    durations = []
+    for repetition in range(repeat):
+        if setup is not None:
+            setup(repetition)
+        started = time.perf_counter()
+        function(repetition)
+        durations.append(time.perf_counter() - started)
+    return {"min": min(durations), "median": statistics.median(durations), "mean": statistics.mean(durations),
+            "repeat": repeat}
+
+
+def mark_all_habits_stale(repetition=None):
+    """
+    Marks the statistics of all habits as out of date, so that the next list request recalculates all of them.
+
+    Args:
+        repetition (int, optional): Ignored, allows the function to be used as setup of time_call.
+
+    Returns:
+        None
+    """
+    # Retrieving the shared database connection
+    conn = connection_manager.get_connection()
+    conn.execute("UPDATE Habit SET StatsDirty = 1")
+    conn.commit()
+
+
+def benchmark_database(repeat):
+    """
+    Times the database and controller hot paths against the current database (see connection_manager.using_database).
+
+    The statistics are timed once per provider for all habits. The list functions are timed once with up to date
+    statistics and once with all habits out of date. Completions, creations (including the duplicate checks) and
+    deletions each work on different habits in every repetition.
+
+    Args:
+        repeat (int): The number of repetitions of every benchmark.
+
+    Returns:
+        dict: The timings of every benchmark, keyed by benchmark name.
+    """
+    results = {}
+
+    # Recalculating the statistics of all habits
+    for provider in sorted(database.STATISTICS_PROVIDERS):
+        results[f"update_database[{provider}]"] = time_call(lambda _: database.update_database(provider), repeat)
+    results["update_stale_habits[up to date]"] = time_call(lambda _: database.update_stale_habits(), repeat)
+
+    # Retrieving the habit lists, as the GUI does when a list is shown
+    list_functions = [controller.give_habit_list_by_ID, controller.give_habit_list_daily,
+                      controller.give_habit_list_weekly, controller.give_habit_list_by_break_count,
+                      controller.give_habit_list_by_current_streak, controller.give_habit_list_by_longest_streak]
+    for list_function in list_functions:
+        results[list_function.__name__] = time_call(lambda _: list_function(), repeat)
+        results[f"{list_function.__name__}[all stale]"] = time_call(lambda _: list_function(), repeat,
+                                                                    setup=mark_all_habits_stale)
+
+    # Completing a different existing habit in every repetition
+    habit_names = controller.get_habit_list()
+    results["complete_habit"] = time_call(lambda repetition: controller.complete_habit(habit_names[repetition]),
+                                          min(repeat, len(habit_names)))
+    results["complete_habit[already completed]"] = time_call(
+        lambda repetition: controller.complete_habit(habit_names[repetition]), min(repeat, len(habit_names)))
+
+    # Creating habits, once with a name that exists already and once with new names
+    results["create_daily_habit[duplicate]"] = time_call(
+        lambda repetition: controller.create_daily_habit(habit_names[repetition % len(habit_names)].lower()), repeat)
+    results["create_daily_habit[new]"] = time_call(
+        lambda repetition: controller.create_daily_habit(f"Benchmark Daily Habit {repetition}"), repeat)
+    results["create_weekly_habit[new]"] = time_call(
+        lambda repetition: controller.create_weekly_habit(f"Benchmark Weekly Habit {repetition}"), repeat)
+
+    # Deleting the habits created above
+    results["sql_delete_habit"] = time_call(
+        lambda repetition: database.sql_delete_habit(f"Benchmark Daily Habit {repetition}"), repeat)
+    for repetition in range(repeat):
+        database.sql_delete_habit(f"Benchmark Weekly Habit {repetition}")
+
+    return results
+
+
+def run_benchmarks(sizes=None, repeat=5, directory=None, seed=1):
+    """
+    Generates databases of increasing size (see dataset_generator) and benchmarks each of them.
+
+    The databases end two days ago, so that every generated habit can be completed during the benchmark.
+
+    Args:
+        sizes (list, optional): The database sizes as (number of habits, years of history), defaults to DEFAULT_SIZES.
+        repeat (int, optional): The number of repetitions of every benchmark. Defaults to 5.
+        directory (str, optional): The directory the databases are generated in, defaults to a temporary directory
+            that is removed afterwards.
+        seed (int, optional): The seed of the dataset generator. Defaults to 1.
+
+    Returns:
+        dict: The environment the benchmarks ran in and one result per database size.
+    """
+    if sizes is None:
+        sizes = DEFAULT_SIZES
+
+    report = {
+        "created": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sql.sqlite_version,
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "seed": seed,
+        "results": [],
+    }
+
+    with contextlib.ExitStack() as stack:
+        # Creating a temporary directory only if the databases should not be kept
+        if directory is None:
+            directory = stack.enter_context(tempfile.TemporaryDirectory())
+        for habit_count, years in sizes:
+            path = os.path.join(directory, f"benchmark_{habit_count}_habits_{years}_years.db")
+            summary = dataset_generator.generate_database(path, habit_count, years, seed=seed,
+                                                          end_date=datetime.date.today() - datetime.timedelta(days=2),
+                                                          overwrite=True)
+            with connection_manager.using_database(path):
+                timings = benchmark_database(repeat)
+            connection_manager.close_connections(path)
+            report["results"].append({"habits": habit_count, "years": years, "executions": summary["executions"],
+                                      "generation_seconds": summary["seconds"], "timings": timings})
+
+    return report
+
+
+def parse_size(text):
+    """
+    Parses a database size given on the command line.
+
+    Args:
+        text (str): The size as HABITSxYEARS, e.g. "1000x5".
+
+    Returns:
+        tuple: The number of habits and the years of history.
+    """
+    habit_count, years = text.lower().split("x")
+    return int(habit_count), float(years)
+
+
+def main(arguments=None):
+    """
+    Command line interface of the benchmark suite.
+
+    Example usage:
+    - python benchmark.py --sizes 100x1 1000x1 1000x10 --output results.json
+
+    Args:
+        arguments (list, optional): The command line arguments, defaults to sys.argv.
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks the habit tracker against generated databases.")
+    parser.add_argument("--sizes", nargs="+", type=parse_size,
+                        help="database sizes as HABITSxYEARS (default: 10x1 100x1 1000x1 1000x5)")
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions of every benchmark (default: 5)")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the dataset generator (default: 1)")
+    parser.add_argument("--directory", help="keep the generated databases in this directory")
+    parser.add_argument("--output", help="write the results to this JSON file instead of printing them")
+    options = parser.parse_args(arguments)
+
+    report = run_benchmarks(options.sizes, options.repeat, options.directory, options.seed)
+    if options.output:
+        with open(options.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
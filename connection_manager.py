@@ -0,0 +1,219 @@
+import collections
+import contextlib
+import contextvars
+import itertools
+import sqlite3 as sql
+import threading
+import weakref
+
+# Default location of the habit tracker database
+DATABASE_PATH = "habit_tracker.db"
+
+# PRAGMAs applied to every connection when it is opened
+# WAL lets readers and the writer work concurrently, NORMAL synchronous is safe in WAL mode and avoids an fsync per
+# commit, the remaining settings keep temporary data and recently used pages in memory.
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA mmap_size = 268435456",
+)
+
+# Database used by get_connection when no path is given, see using_database
+current_database_path = contextvars.ContextVar("current_database_path", default=None)
+
+# Seconds a connection waits for a lock held by another connection before raising "database is locked"
+BUSY_TIMEOUT = 5.0
+
+# Maximum number of connections all threads of the process keep open together, e.g. to the databases of different
+# tenants (see tenants.py). The least recently used idle connection is closed when another database is opened.
+MAX_OPEN_CONNECTIONS = 64
+
+# Connections of all threads, keyed by (owner key, database path), the most recently used last. Every value is the
+# connection and whether other threads may close it while it is idle (see get_connection).
+open_connections = collections.OrderedDict()
+
+# Number of active using_database contexts for every (owner key, database path)
+database_leases = collections.Counter()
+
+# Guards open_connections and database_leases, which are shared by all threads
+connections_lock = threading.Lock()
+
+# Source of the keys that identify the threads owning connections, never reused unlike thread identifiers
+owner_keys = itertools.count(1)
+
+# The ConnectionOwner of every thread
+thread_local_storage = threading.local()
+
+
+class ConnectionOwner:
+    """
+    Identifies the thread that owns connections in open_connections. It is only referenced by the thread-local
+    storage of its thread, so it is released when the thread ends, which closes the remaining connections of the
+    thread.
+    """
+
+    def __init__(self):
+        self.key = next(owner_keys)
+        weakref.finalize(self, close_owner_connections, self.key)
+
+
+def get_owner_key():
+    """
+    Returns the key of the calling thread in open_connections and database_leases.
+
+    Returns:
+        int: The owner key of the calling thread.
+    """
+    owner = getattr(thread_local_storage, "owner", None)
+    if owner is None:
+        owner = ConnectionOwner()
+        thread_local_storage.owner = owner
+    return owner.key
+
+
+def close_owner_connections(owner_key, path=None):
+    """
+    Closes the connections of a thread. Uncommitted changes are rolled back.
+
+    Args:
+        owner_key (int): The owner key of the thread, see get_owner_key.
+        path (str, optional): Only close the connection to this database file, defaults to closing all connections.
+
+    Returns:
+        None
+    """
+    with connections_lock:
+        closed_connections = [open_connections.pop(key)[0] for key in list(open_connections)
+                              if key[0] == owner_key and (path is None or key[1] == path)]
+    for conn in closed_connections:
+        conn.close()
+
+
+def open_connection(path):
+    """
+    Opens a new connection to the database file at the given path and applies the connection PRAGMAs.
+
+    Args:
+        path (str): The path of the SQLite database file.
+
+    Returns:
+        sqlite3.Connection: The newly opened connection.
+    """
+    # Connections may be closed by other threads once they are idle, see get_connection
+    conn = sql.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def get_database_path():
+    """
+    Returns the path of the database the database functions currently operate on.
+
+    Returns:
+        str: The path selected with using_database, or DATABASE_PATH if none was selected.
+    """
+    path = current_database_path.get()
+    if path is None:
+        path = DATABASE_PATH
+    return path
+
+
+@contextlib.contextmanager
+def using_database(path):
+    """
+    Context manager that makes all database functions called within it operate on the database file at the given
+    path instead of DATABASE_PATH. The connection of the calling thread to the database is not closed by other
+    threads while the context is active (see get_connection).
+
+    Args:
+        path (str): The path of the SQLite database file.
+
+    Example usage:
+    - with using_database("fixture.db"):
+          database.update_database()
+    """
+    lease_key = (get_owner_key(), path)
+    with connections_lock:
+        database_leases[lease_key] += 1
+    token = current_database_path.set(path)
+    try:
+        yield path
+    finally:
+        current_database_path.reset(token)
+        with connections_lock:
+            database_leases[lease_key] -= 1
+            if not database_leases[lease_key]:
+                del database_leases[lease_key]
+
+
+def get_connection(path=None):
+    """
+    Returns the long-lived connection of the calling thread to the habit tracker database.
+
+    The connection is opened on first use and then kept open, so that consecutive database functions do not pay for
+    opening and closing the database file and re-reading the schema. Every thread gets its own connection.
+
+    All threads of the process keep at most MAX_OPEN_CONNECTIONS connections open together. When another database is
+    opened, the least recently used idle connections are closed. A connection is idle if it is not inside a
+    transaction and, if it belongs to another thread, was only ever used within a using_database context of that
+    thread that has ended since. Connections used without such a context, e.g. to DATABASE_PATH, are only closed by
+    their own thread. The limit is exceeded while all connections are in use.
+
+    Args:
+        path (str, optional): The path of the SQLite database file, defaults to the current database
+            (see get_database_path).
+
+    Returns:
+        sqlite3.Connection: The connection of the calling thread.
+    """
+    if path is None:
+        path = get_database_path()
+    owner_key = get_owner_key()
+    key = (owner_key, path)
+
+    with connections_lock:
+        # Connections used outside of a using_database context of their thread may be in use at any time
+        leased = database_leases[key] > 0
+        entry = open_connections.get(key)
+        if entry is not None:
+            open_connections.move_to_end(key)
+            if entry[1] and not leased:
+                open_connections[key] = (entry[0], False)
+            return entry[0]
+
+    conn = open_connection(path)
+
+    with connections_lock:
+        open_connections[key] = (conn, leased)
+
+        # Closing the least recently used idle connections of all threads
+        closed_connections = []
+        for candidate_key, (candidate, shared) in list(open_connections.items()):
+            if len(open_connections) <= MAX_OPEN_CONNECTIONS:
+                break
+            if candidate_key in database_leases or candidate.in_transaction or candidate_key == key:
+                continue
+            if candidate_key[0] == owner_key or shared:
+                closed_connections.append(open_connections.pop(candidate_key)[0])
+
+    for candidate in closed_connections:
+        candidate.close()
+    return conn
+
+
+def close_connections(path=None):
+    """
+    Closes the connections opened by the calling thread.
+
+    Uncommitted changes are rolled back. The next call to get_connection opens a fresh connection.
+
+    Args:
+        path (str, optional): Only close the connection to this database file, defaults to closing all connections.
+
+    Returns:
+        None
+    """
+    close_owner_connections(get_owner_key(), path)
@@ -1,6 +1,6 @@
 import habit
-import GUI
 import database
+import migrations
 import sqlite3 as sql
 
 
@@ -26,18 +26,11 @@ def create_daily_habit(name, periodicity="daily"):
     # Creating a habit instance
     new_habit_name, new_habit_periodicity = habit.Habit.create_habit(name, periodicity)
 
-    # Checking habit names in database for duplicates
-    current_habit_names = get_habit_list()
-    current_habit_names = {name.upper() for name in current_habit_names}
-    new_habit_names = current_habit_names.copy()  # Creating a copy of the set
-    new_habit_names.add(new_habit_name.upper())  # Trying to add the new habit name to the set
-    new_habit_names_len = len(new_habit_names)
-
-    if len(current_habit_names) == new_habit_names_len:  # Comparing set lengths (before vs after addition of new habit)
-        return True  # = Duplicate if name already exists in database, GUI will prompt the user to define another name
-    else:
-        database.sql_create_habit(new_habit_name, new_habit_periodicity)  # Adding habit to database (no duplicate)
+    # Adding habit to database, which fails if the name already exists regardless of case
+    if database.sql_create_habit(new_habit_name, new_habit_periodicity):
         return False  # GUI will notify user of successfully created habit
+    else:
+        return True  # = Duplicate if name already exists in database, GUI will prompt the user to define another name
 
 
 def create_weekly_habit(name, periodicity="weekly"):
@@ -60,18 +53,11 @@ def create_weekly_habit(name, periodicity="weekly"):
     # Creating a habit instance
     new_habit_name, new_habit_periodicity = habit.Habit.create_habit(name, periodicity)
 
-    # Checking habit names in database for duplicates
-    current_habit_names = get_habit_list()
-    current_habit_names = {name.upper() for name in current_habit_names}
-    new_habit_names = current_habit_names.copy()  # Creating a copy of the set
-    new_habit_names.add(new_habit_name.upper())  # Trying to add the new habit name to the set
-    new_habit_names_len = len(new_habit_names)
-
-    if len(current_habit_names) == new_habit_names_len:  # Comparing set lengths (before vs after addition of new habit)
-        return True  # = Duplicate if name already exists in database, GUI will prompt the user to define another name
-    else:
-        database.sql_create_habit(new_habit_name, new_habit_periodicity)  # Adding habit to database (no duplicate)
+    # Adding habit to database, which fails if the name already exists regardless of case
+    if database.sql_create_habit(new_habit_name, new_habit_periodicity):
         return False  # GUI will notify user of successfully created habit
+    else:
+        return True  # = Duplicate if name already exists in database, GUI will prompt the user to define another name
 
 
 ### From GUI to database
@@ -80,9 +66,9 @@ def complete_habit(name):
     """
     Marks the habit with the given name as completed for today and updates its data in the habit tracker database.
 
-    This function is called when the user completes a habit for the day. It retrieves the habit's data from the
-    database, checks whether it has already been completed today, and updates the habit's data in the database
-    accordingly. If the habit has not already been completed today, the function updates its data in the database and
+    This function is called when the user completes a habit for the day. It checks whether the habit has already been
+    completed today and updates the habit's data in the database accordingly. If the habit has not already been
+    completed today, the new execution is stored, the habit's streaks are advanced incrementally and the function
     returns True. If the habit has already been completed today, the function does not update its data and returns
     False. Returning False prompts the GUI to inform the User that the habit cannot be completed a second time
     on the same day.
@@ -93,23 +79,25 @@ def complete_habit(name):
     Returns:
         bool: True if the habit was successfully marked as completed, False if it had already been completed today.
     """
-    # Retrieving data from database
-    ID, name, periodicity, days_since_last_completion, current_streak, \
-    longest_streak, number_of_breaks = database.sql_return_habit(name)
-
-    # Checking if habit was already completed today
-    if database.sql_check_if_habit_already_completed(name):
-        # Accessing main logic to modify habit data
-        # habit = main.Habit(name, periodicity, days_since_last_completion, current_streak, longest_streak,
-        #                    number_of_breaks)
-        # days_since_last_completion, current_streak, longest_streak, name = main.Habit.complete_habit(habit)
-
-        # Passing completed data back to database
-        database.sql_update_habit_data(days_since_last_completion, current_streak, longest_streak, name)
-        database.sql_update_habit_execution_data(name)
-        return True
-    else:
-        return False
+    # Resolving the habit name once, then recording the completion and updating the streaks in one transaction
+    habit_ID = database.sql_get_habit_ID(name)
+    return database.sql_complete_habit_by_ID(habit_ID)
+
+
+def complete_habits(completions):
+    """
+    Records a batch of habit completions, e.g. exported from a device or another application, at once.
+
+    Completions that violate the once-per-day rule or refer to habits that do not exist are rejected, all other
+    completions are stored in one transaction and the streaks of the affected habits are updated afterwards.
+
+    Args:
+        completions (iterable): (habit name, completion time) pairs, the completion time as datetime or timestamp.
+
+    Returns:
+        tuple: The number of recorded completions and the list of rejected (habit name, completion time) pairs.
+    """
+    return database.sql_complete_habits(completions)
 
 
 def delete_habit(name):
@@ -124,7 +112,8 @@ def delete_habit(name):
     Returns:
         None
     """
-    database.sql_delete_habit(name)
+    habit_ID = database.sql_get_habit_ID(name)
+    database.sql_delete_habit_by_ID(habit_ID)
 
 
 ### From Database to GUI
@@ -148,7 +137,9 @@ def give_habit_list_by_ID():
     """
     Calls the function "sql_get_habit_list_by_ID" from the database module which in turn retrieves a list of
     habit data from the Habit table in the habit tracker database, sorted by HabitName.
-    Prior to that the data in the database is updated.
+    Before the first page is retrieved, the data of all habits that changed since the last update is updated in the
+    database. Later pages are retrieved without an update, since recalculated statistics can reorder the habits and
+    make the cursor skip or repeat rows.
 
     Returns:
         List of tuples: Each tuple represents a row from the Habit table, with the data in the following order:
@@ -160,8 +151,8 @@ def give_habit_list_by_ID():
                 - LongestStreak (int): The longest streak of days on which the habit has been completed.
                 - NumberOfBreaks (int): The number of times the habit has been broken.
     """
-    # Updating streak and break data in database
-    database.update_database()
+    # Updating streak and break data of habits that changed since the last update
+    database.update_stale_habits()
 
     return database.sql_get_habit_list_by_ID()
 
@@ -172,7 +163,7 @@ def give_habit_list_daily():
     Calls the function "sql_get_habit_list_daily" from the database module which in turn retrieves a list of
     habit data from the Habit table in the habit tracker database. It hereby only retrieves habits with
     the periodicity "daily".
-    Prior to that the data in the database is updated.
+    Prior to that the data of all habits that changed since the last update is updated in the database.
 
     Returns:
         List of tuples: Each tuple represents a row from the Habit table, with the data in the following order:
@@ -184,8 +175,8 @@ def give_habit_list_daily():
                 - LongestStreak (int): The longest streak of days on which the habit has been completed.
                 - NumberOfBreaks (int): The number of times the habit has been broken.
     """
-    # Updating streak and break data in database
-    database.update_database()
+    # Updating streak and break data of habits that changed since the last update
+    database.update_stale_habits()
 
     return database.sql_get_habit_list_daily()
 
@@ -196,7 +187,7 @@ def give_habit_list_weekly():
     Calls the function "sql_get_habit_list_weekly" from the database module which in turn retrieves a list of
     habit data from the Habit table in the habit tracker database. It hereby only retrieves habits with
     the periodicity "weekly".
-    Prior to that the data in the database is updated.
+    Prior to that the data of all habits that changed since the last update is updated in the database.
 
     Returns:
         List of tuples: Each tuple represents a row from the Habit table, with the data in the following order:
@@ -208,8 +199,8 @@ def give_habit_list_weekly():
                 - LongestStreak (int): The longest streak of days on which the habit has been completed.
                 - NumberOfBreaks (int): The number of times the habit has been broken.
     """
-    # Updating streak and break data in database
-    database.update_database()
+    # Updating streak and break data of habits that changed since the last update
+    database.update_stale_habits()
 
     return database.sql_get_habit_list_weekly()
 
@@ -219,7 +210,7 @@ def give_habit_list_by_break_count():
     """
     Calls the function "sql_get_habit_list_by_break_count" from the database module which in turn retrieves a list of
     habit data from the Habit table in the habit tracker database, sorted by the number of breaks in descending order.
-    Prior to that the data in the database is updated.
+    Prior to that the data of all habits that changed since the last update is updated in the database.
 
     Returns:
         List of tuples: Each tuple represents a row from the Habit table, with the data in the following order:
@@ -231,8 +222,8 @@ def give_habit_list_by_break_count():
                 - LongestStreak (int): The longest streak of days on which the habit has been completed.
                 - NumberOfBreaks (int): The number of times the habit has been broken.
     """
-    # Updating streak and break data in database
-    database.update_database()
+    # Updating streak and break data of habits that changed since the last update
+    database.update_stale_habits()
 
     return database.sql_get_habit_list_by_break_count()
 
@@ -242,7 +233,7 @@ def give_habit_list_by_current_streak():
     """
     Calls the function "sql_get_habit_list_by_current_streak" from the database module which in turn retrieves a list of
     habit data from the Habit table in the habit tracker database, sorted by the current streak in descending order.
-    Prior to that the data in the database is updated.
+    Prior to that the data of all habits that changed since the last update is updated in the database.
 
     Returns:
         List of tuples: Each tuple represents a row from the Habit table, with the data in the following order:
@@ -254,8 +245,8 @@ def give_habit_list_by_current_streak():
                 - LongestStreak (int): The longest streak of days on which the habit has been completed.
                 - NumberOfBreaks (int): The number of times the habit has been broken.
     """
-    # Updating streak and break data in database
-    database.update_database()
+    # Updating streak and break data of habits that changed since the last update
+    database.update_stale_habits()
 
     return database.sql_get_habit_list_by_current_streak()
 
@@ -265,7 +256,7 @@ def give_habit_list_by_longest_streak():
     """
     Calls the function "sql_get_habit_list_by_longest_streak" from the database module which in turn retrieves a list of
     habit data from the Habit table in the habit tracker database, sorted by the longest streak in descending order.
-    Prior to that the data in the database is updated.
+    Prior to that the data of all habits that changed since the last update is updated in the database.
 
     Returns:
         List of tuples: Each tuple represents a row from the Habit table, with the data in the following order:
@@ -277,19 +268,49 @@ def give_habit_list_by_longest_streak():
                 - LongestStreak (int): The longest streak of days on which the habit has been completed.
                 - NumberOfBreaks (int): The number of times the habit has been broken.
     """
-    # Updating streak and break data in database
-    database.update_database()
+    # Updating streak and break data of habits that changed since the last update
+    database.update_stale_habits()
 
     return database.sql_get_habit_list_by_longest_streak()
 
 
+# Data Analysis
+def give_habit_page(periodicity=None, sort_key="HabitName", descending=False, limit=None, after=None, refresh=None):
+    """
+    Calls the function "sql_query_habits" from the database module which in turn retrieves one page of habit data
+    from the Habit table in the habit tracker database, filtered and sorted as requested.
+    Prior to that the data of all habits that changed since the last update is updated in the database.
+
+    Args:
+        periodicity (str, optional): Only return habits with this periodicity ("daily" or "weekly"), defaults to all.
+        sort_key (str, optional): The column to sort by, see database.HABIT_SORT_KEYS. Defaults to "HabitName".
+        descending (bool, optional): Whether to sort in descending order. Defaults to False.
+        limit (int, optional): The maximum number of rows to return, defaults to all remaining rows.
+        after (tuple, optional): The cursor returned with the previous page, defaults to starting at the first row.
+        refresh (bool, optional): Whether to update the data of changed habits first, defaults to updating it only
+            for the first page (if after is None).
+
+    Returns:
+        tuple: The list of habit rows (see give_habit_list_by_ID) and the cursor of the next page, which is None if
+        there are no more rows.
+    """
+    # Updating streak and break data of habits that changed since the last update
+    if refresh or (refresh is None and after is None):
+        database.update_stale_habits()
+
+    return database.sql_query_habits(periodicity, sort_key, descending, limit, after)
+
+
 def run_GUI():
     """
     Runs the GUI application.
 
     This function creates an instance of the GUI.Menu class and starts the main event loop
     to display and handle user interactions with the graphical user interface.
+    The GUI module is only imported here, so that the controller can be used without tkinter (e.g. by server.py).
     """
+    import GUI
+
     app = GUI.Menu()
     app.mainloop()
 
@@ -298,25 +319,28 @@ def create_database(percentage):
     """
     Creates the initial habit_tracker.db database.
 
-    This function sets up a database using the "setup_database" function.
+    This function sets up a database using the "setup_database" function and upgrades its schema to the latest version
+    using the "apply_migrations" function of the migrations.py module.
     It then deletes a percentage of random executions from the database using the "delete_random_executions" function.
     Finally, it updates the database by calling the "update_database" function.
-    All the functions listed are parts of the database.py module.
+    The last three functions listed are parts of the database.py module.
 
     Note:
     - The "percentage" parameter specifies the percentage of random executions to delete from the database.
     - If the database already exists, the "OperationalError" exception from the "sql" module is caught
-      and the function does nothing.
+      and the function only upgrades its schema using the "apply_migrations" function of the migrations.py module.
 
     Args:
     - percentage (int): The percentage of random executions to delete from the HabitExecution table in the database.
     """
     try:
         database.setup_database()
-        database.delete_random_executions(percentage)
-        database.update_database()
     except sql.OperationalError:  # If database already exists, it shouldn't be created again
-        pass
+        migrations.apply_migrations()  # Upgrading databases created by earlier versions in place
+        return
+    migrations.apply_migrations()
+    database.delete_random_executions(percentage)
+    database.update_database()
 
 
 if __name__ == "__main__":
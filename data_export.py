@@ -0,0 +1,229 @@
+import argparse
+import csv
+import gzip
+import json
+import lzma
+import os
+import time
+import connection_manager
+
+# Supported file formats and compressions, the file extensions are appended to the table name
+DATA_FORMATS = ("csv", "jsonl")
+COMPRESSIONS = {None: "", "gzip": ".gz", "lzma": ".xz"}
+
+# Number of rows fetched from SQLite and written to the file at once
+FETCH_SIZE = 5000
+
+# Compression levels favouring speed, since exports of large tables are written in one go
+GZIP_LEVEL = 6
+LZMA_PRESET = 1
+
+# Exported tables: (column names, query). Executions are exported with the name and periodicity of their habit, so
+# that they can be imported into another database whose habit IDs differ (see data_import).
+EXPORT_TABLES = {
+    "habits": (("ID", "HabitName", "Periodicity", "DaysSinceLastCompletion", "CurrentStreak", "LongestStreak",
+                "NumberOfBreaks", "LastCompletion"),
+               '''SELECT ID, HabitName, Periodicity, DaysSinceLastCompletion, CurrentStreak, LongestStreak,
+               NumberOfBreaks, LastCompletion FROM Habit ORDER BY ID'''),
+    "executions": (("HabitID", "HabitName", "Periodicity", "DateTime", "Timestamp"),
+                   '''SELECT e.HabitID, h.HabitName, h.Periodicity, e.DateTime, e.Timestamp
+                   FROM Habit h JOIN HabitExecution e ON e.HabitID = h.ID ORDER BY h.ID, e.Timestamp'''),
+}
+
+
+def get_file_type(path):
+    """
+    Derives the data format and the compression of a data file from its file name, e.g. "executions.csv.gz".
+
+    Args:
+        path (str): The path of the data file.
+
+    Returns:
+        tuple: The data format (see DATA_FORMATS) and the compression (see COMPRESSIONS).
+
+    Raises:
+        ValueError: If the file name does not end with a supported extension.
+    """
+    name = os.path.basename(path).lower()
+    compression = None
+    for candidate, extension in COMPRESSIONS.items():
+        if candidate is not None and name.endswith(extension):
+            compression = candidate
+            name = name[:-len(extension)]
+    for data_format in DATA_FORMATS:
+        if name.endswith("." + data_format):
+            return data_format, compression
+    raise ValueError(f"Unsupported file type of {path}, expected one of {', '.join(DATA_FORMATS)} "
+                     f"optionally followed by .gz or .xz")
+
+
+def open_data_file(path, mode="r", compression=None):
+    """
+    Opens a data file in text mode, compressed with gzip or lzma if requested.
+
+    Args:
+        path (str): The path of the data file.
+        mode (str, optional): "r" to read the file or "w" to write it. Defaults to "r".
+        compression (str, optional): The compression of the file (see COMPRESSIONS), defaults to none.
+
+    Returns:
+        file object: The opened text file.
+    """
+    if compression == "gzip":
+        return gzip.open(path, mode + "t", compresslevel=GZIP_LEVEL, encoding="utf-8", newline="")
+    if compression == "lzma":
+        return lzma.open(path, mode + "t", preset=LZMA_PRESET if mode == "w" else None, encoding="utf-8",
+                         newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def iterate_rows(cursor, query, parameters=()):
+    """
+    Generator yielding the rows of a query without loading the whole result into memory. The rows are fetched in
+    batches of FETCH_SIZE.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor used to run the query.
+        query (str): The SQL query.
+        parameters (tuple, optional): The parameters of the query.
+
+    Yields:
+        tuple: The rows of the query.
+    """
+    cursor.execute(query, parameters)
+    while True:
+        rows = cursor.fetchmany(FETCH_SIZE)
+        if not rows:
+            break
+        yield from rows
+
+
+def write_rows(rows, file, columns, data_format):
+    """
+    Writes rows to a CSV file with a header row, or to a JSONL file with one JSON object per row.
+
+    Args:
+        rows (iterable): The rows to write, the values in the order of columns.
+        file (file object): The text file to write to.
+        columns (tuple): The column names.
+        data_format (str): "csv" or "jsonl".
+
+    Returns:
+        int: The number of rows written.
+    """
+    row_count = 0
+    if data_format == "csv":
+        writer = csv.writer(file)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(row)
+            row_count += 1
+    else:
+        encoder = json.JSONEncoder(ensure_ascii=False)
+        for row in rows:
+            file.write(encoder.encode(dict(zip(columns, row))) + "\n")
+            row_count += 1
+    return row_count
+
+
+def export_table(cursor, table, path, data_format=None, compression=None):
+    """
+    Streams one table of the current database (see connection_manager.using_database) into a data file.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor used to read the table.
+        table (str): The table to export, one of the keys of EXPORT_TABLES.
+        path (str): The data file to write.
+        data_format (str, optional): The data format, derived from the file name by default (see get_file_type).
+        compression (str, optional): The compression, derived from the file name if data_format is not given.
+
+    Returns:
+        dict: The table, the file, the number of exported rows, the duration in seconds and the rows per second.
+    """
+    if data_format is None:
+        data_format, compression = get_file_type(path)
+    columns, query = EXPORT_TABLES[table]
+
+    started = time.perf_counter()
+    with open_data_file(path, "w", compression) as file:
+        row_count = write_rows(iterate_rows(cursor, query), file, columns, data_format)
+    seconds = time.perf_counter() - started
+
+    return {"table": table, "path": path, "rows": row_count, "seconds": round(seconds, 3),
+            "rows_per_second": round(row_count / seconds) if seconds else None}
+
+
+def export_database(directory, data_format="csv", compression=None, tables=tuple(EXPORT_TABLES)):
+    """
+    Exports the tables of the current database (see connection_manager.using_database) into one data file per table,
+    e.g. habits.csv and executions.csv. All tables are read within one transaction, so the files reflect the same state
+    of the database even if it is changed during the export. Memory usage does not depend on the size of the tables.
+
+    Args:
+        directory (str): The directory to write the data files to, created if it does not exist.
+        data_format (str, optional): "csv" or "jsonl". Defaults to "csv".
+        compression (str, optional): None, "gzip" or "lzma". Defaults to None.
+        tables (iterable, optional): The tables to export, defaults to all tables of EXPORT_TABLES.
+
+    Returns:
+        list: The summary of every exported table, see export_table.
+    """
+    if data_format not in DATA_FORMATS:
+        raise ValueError(f"Unsupported data format {data_format!r}")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unsupported compression {compression!r}")
+    os.makedirs(directory, exist_ok=True)
+
+    # Retrieving the shared database connection
+    conn = connection_manager.get_connection()
+
+    # Creating a cursor
+    cursor = conn.cursor()
+
+    # Reading all tables from the same snapshot of the database
+    cursor.execute("BEGIN")
+    try:
+        summaries = [export_table(cursor, table,
+                                  os.path.join(directory, f"{table}.{data_format}{COMPRESSIONS[compression]}"),
+                                  data_format, compression)
+                     for table in tables]
+    finally:
+        conn.rollback()
+
+        # Closing the cursor
+        cursor.close()
+
+    return summaries
+
+
+def main(arguments=None):
+    """
+    Command line interface of the export.
+
+    Example usage:
+    - python data_export.py exports --format jsonl --compression gzip
+
+    Args:
+        arguments (list, optional): The command line arguments, defaults to sys.argv.
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Exports the habits and their executions into CSV or JSONL files.")
+    parser.add_argument("directory", help="directory to write the files to")
+    parser.add_argument("--database", help="database file to export (default: habit_tracker.db)")
+    parser.add_argument("--format", choices=DATA_FORMATS, default="csv", help="file format (default: csv)")
+    parser.add_argument("--compression", choices=[name for name in COMPRESSIONS if name],
+                        help="compress the files with gzip or lzma (default: none)")
+    parser.add_argument("--tables", nargs="+", choices=list(EXPORT_TABLES), default=list(EXPORT_TABLES),
+                        help="tables to export (default: all)")
+    options = parser.parse_args(arguments)
+
+    with connection_manager.using_database(options.database or connection_manager.DATABASE_PATH):
+        for summary in export_database(options.directory, options.format, options.compression, options.tables):
+            print(f"Exported {summary['rows']} {summary['table']} to {summary['path']} in {summary['seconds']} "
+                  f"seconds ({summary['rows_per_second']} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import argparse
+import csv
+import datetime
+import itertools
+import json
+import time
+import analytics
+import connection_manager
+import data_export
+import database
+import migrations
+
+# Number of input rows inserted per transaction
+BATCH_SIZE = 5000
+
+
+def read_records(path, data_format=None, compression=None):
+    """
+    Generator yielding the records of a CSV or JSONL file one by one, without reading the whole file into memory.
+    CSV files need a header row.
+
+    Args:
+        path (str): The data file to read.
+        data_format (str, optional): "csv" or "jsonl", derived from the file name by default (see
+            data_export.get_file_type).
+        compression (str, optional): None, "gzip" or "lzma", derived from the file name if data_format is not given.
+
+    Yields:
+        dict: The fields of every record.
+    """
+    if data_format is None:
+        data_format, compression = data_export.get_file_type(path)
+    with data_export.open_data_file(path, "r", compression) as file:
+        if data_format == "csv":
+            yield from csv.DictReader(file)
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def parse_execution(record, default_periodicity="daily"):
+    """
+    Extracts a habit execution from an input record. The files written by data_export can be read directly; other
+    trackers only need to provide the columns HabitName and DateTime or Timestamp, plus Periodicity if habits should
+    not be created as default_periodicity.
+
+    Args:
+        record (dict): The fields of the input record.
+        default_periodicity (str, optional): The periodicity of new habits if the record has none. Defaults to
+            "daily".
+
+    Returns:
+        tuple: The habit name, the periodicity of the habit and the timestamp of the execution.
+
+    Raises:
+        ValueError: If the habit name or the time of the execution is missing or invalid.
+    """
+    habit_name = str(record.get("HabitName") or "").strip()
+    if not habit_name:
+        raise ValueError("The habit name is missing")
+    periodicity = record.get("Periodicity") or default_periodicity
+    if periodicity not in ("daily", "weekly"):
+        raise ValueError(f"Invalid periodicity {periodicity!r}")
+
+    # Preferring the timestamp, which is exact, over the DateTime text
+    if record.get("Timestamp") not in (None, ""):
+        timestamp = int(record["Timestamp"])
+    elif record.get("DateTime"):
+        timestamp = analytics.datetime_to_timestamp(datetime.datetime.fromisoformat(str(record["DateTime"])))
+    else:
+        raise ValueError("The time of the execution is missing")
+    return habit_name, periodicity, timestamp
+
+
+def resolve_habit_IDs(executions, habit_IDs, created_habits):
+    """
+    Resolves the habit names of a batch of executions to habit IDs, creating the habits that do not exist yet with
+    database.sql_create_habit.
+
+    Args:
+        executions (list): (habit name, periodicity, timestamp) tuples, see parse_execution.
+        habit_IDs (dict): The habit IDs resolved so far, keyed by habit name as spelled in the input. Updated in
+            place.
+        created_habits (list): The names of the habits created so far. Updated in place.
+
+    Returns:
+        None
+    """
+    for habit_name, periodicity, timestamp in executions:
+        if habit_name in habit_IDs:
+            continue
+        habit_ID = database.sql_get_habit_ID(habit_name)
+        if habit_ID is None:
+            # A habit that was created concurrently under the same name is used as well
+            if database.sql_create_habit(habit_name, periodicity):
+                created_habits.append(habit_name)
+            habit_ID = database.sql_get_habit_ID(habit_name)
+        habit_IDs[habit_name] = habit_ID
+
+
+def insert_executions(executions, habit_IDs):
+    """
+    Inserts a batch of executions in a single transaction. Executions that exist already for the same habit and
+    time, in the database or earlier in the batch, are skipped.
+
+    Args:
+        executions (list): (habit name, periodicity, timestamp) tuples, see parse_execution.
+        habit_IDs (dict): The IDs of all habits of the batch, see resolve_habit_IDs.
+
+    Returns:
+        tuple: The number of inserted executions and the set of the IDs of the habits that received executions.
+    """
+    # Removing duplicates within the batch
+    rows = sorted({(habit_IDs[habit_name], timestamp)
+                   for habit_name, periodicity, timestamp in executions})
+
+    # Retrieving the shared database connection
+    conn = connection_manager.get_connection()
+
+    # Creating a cursor
+    cursor = conn.cursor()
+
+    # Inserting the executions that do not exist yet, looked up with the (HabitID, Timestamp) index
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        cursor.executemany('''INSERT INTO HabitExecution (HabitID, DateTime, Timestamp)
+                           SELECT ?1, datetime(?2, 'unixepoch'), ?2
+                           WHERE NOT EXISTS (SELECT 1 FROM HabitExecution WHERE HabitID = ?1 AND Timestamp = ?2)''',
+                           rows)
+        inserted = cursor.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        # Closing the cursor
+        cursor.close()
+
+    return inserted, {habit_ID for habit_ID, timestamp in rows}
+
+
+def import_executions(path, data_format=None, compression=None, default_periodicity="daily", batch_size=BATCH_SIZE):
+    """
+    Imports the execution history of a CSV or JSONL file (see read_records) into the current database (see
+    connection_manager.using_database), e.g. to move users over from another habit tracker.
+
+    The file is streamed in batches of batch_size records, each inserted in its own transaction, so memory usage does
+    not depend on the size of the file. Missing habits are created on the fly. Executions that exist already are
+    skipped, so an interrupted import can simply be run again. The statistics of the affected habits are recalculated
+    once at the end.
+
+    Args:
+        path (str): The data file to import.
+        data_format (str, optional): "csv" or "jsonl", derived from the file name by default.
+        compression (str, optional): None, "gzip" or "lzma", derived from the file name if data_format is not given.
+        default_periodicity (str, optional): The periodicity of new habits whose records have none. Defaults to
+            "daily".
+        batch_size (int, optional): The number of records per transaction. Defaults to BATCH_SIZE.
+
+    Returns:
+        dict: The number of read records, inserted executions and skipped duplicates, the names of the created
+        habits, the duration in seconds and the records per second.
+
+    Raises:
+        ValueError: If a record is invalid. The batches before it stay imported.
+    """
+    # Making sure the tables exist, without inserting sample data into a new database
+    migrations.initialize_database()
+
+    started = time.perf_counter()
+    habit_IDs = {}
+    created_habits = []
+    affected_habit_IDs = set()
+    record_count = 0
+    inserted_count = 0
+
+    records = enumerate(read_records(path, data_format, compression), start=1)
+    while True:
+        batch = list(itertools.islice(records, batch_size))
+        if not batch:
+            break
+        executions = []
+        for record_number, record in batch:
+            try:
+                executions.append(parse_execution(record, default_periodicity))
+            except (ValueError, TypeError) as error:
+                raise ValueError(f"Record {record_number} of {path}: {error}") from error
+        resolve_habit_IDs(executions, habit_IDs, created_habits)
+        inserted, batch_habit_IDs = insert_executions(executions, habit_IDs)
+        record_count += len(batch)
+        inserted_count += inserted
+        affected_habit_IDs |= batch_habit_IDs
+
+    # Recalculating the statistics of all affected habits at once
+    if affected_habit_IDs:
+        database.update_database(habit_IDs=sorted(affected_habit_IDs))
+    seconds = time.perf_counter() - started
+
+    return {"records": record_count, "inserted": inserted_count, "duplicates": record_count - inserted_count,
+            "created_habits": created_habits, "seconds": round(seconds, 3),
+            "rows_per_second": round(record_count / seconds) if seconds else None}
+
+
+def main(arguments=None):
+    """
+    Command line interface of the import.
+
+    Example usage:
+    - python data_import.py exports/executions.jsonl.gz --database habit_tracker.db
+
+    Args:
+        arguments (list, optional): The command line arguments, defaults to sys.argv.
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Imports habit executions from CSV or JSONL files.")
+    parser.add_argument("paths", nargs="+", help="files to import, e.g. executions.csv or executions.jsonl.gz")
+    parser.add_argument("--database", help="database file to import into (default: habit_tracker.db)")
+    parser.add_argument("--periodicity", choices=("daily", "weekly"), default="daily",
+                        help="periodicity of new habits whose records have none (default: daily)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help=f"records per transaction (default: {BATCH_SIZE})")
+    options = parser.parse_args(arguments)
+
+    with connection_manager.using_database(options.database or connection_manager.DATABASE_PATH):
+        for path in options.paths:
+            summary = import_executions(path, default_periodicity=options.periodicity,
+                                        batch_size=options.batch_size)
+            print(f"Imported {summary['inserted']} of {summary['records']} executions from {path} "
+                  f"({summary['duplicates']} duplicates, {len(summary['created_habits'])} new habits) "
+                  f"in {summary['seconds']} seconds ({summary['rows_per_second']} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import argparse
+import datetime
+import os
+import random
+import time
+import analytics
+import connection_manager
+import database
+import migrations
+
+# Patterns in which the generated habits are completed or missed
+# random: every period is completed independently with the completion probability
+# streaky: completions and misses come in runs (a two-state Markov chain), which produces long streaks and long breaks
+# weekdays: like random, but daily habits are never completed on Saturdays and Sundays
+GAP_PATTERNS = ("random", "streaky", "weekdays")
+
+
+def generate_completion_days(rng, periodicity, day_count, completion_probability, gap_pattern,
+                             mean_streak_length=10):
+    """
+    Generates the days on which a single habit is completed.
+
+    Daily habits can be completed on every day, weekly habits on one fixed weekday, which is chosen at random for
+    every habit.
+
+    Args:
+        rng (random.Random): The random number generator to draw from.
+        periodicity (str): The periodicity of the habit, "daily" or "weekly".
+        day_count (int): The number of days to generate completions for.
+        completion_probability (float): The share of periods in which the habit is completed, between 0 and 1.
+        gap_pattern (str): The pattern of completions and misses, one of GAP_PATTERNS.
+        mean_streak_length (int, optional): The average number of periods in a row that are completed with the
+            "streaky" pattern. Defaults to 10.
+
+    Returns:
+        generator: The day numbers (0 is the first day) on which the habit is completed, in ascending order.
+    """
+    if periodicity == "daily":
+        periods = range(day_count)
+    else:
+        periods = range(rng.randrange(7), day_count, 7)
+
+    # The "streaky" chain leaves a run of completions with probability 1 / mean_streak_length and starts a new one
+    # with the probability that keeps the overall share of completed periods at completion_probability
+    break_probability = 1 / max(mean_streak_length, 1)
+    if completion_probability < 1:
+        resume_probability = min(completion_probability * break_probability / (1 - completion_probability), 1)
+    else:
+        resume_probability = 1
+    completed = rng.random() < completion_probability
+
+    for day in periods:
+        if gap_pattern == "streaky":
+            completed = rng.random() >= break_probability if completed else rng.random() < resume_probability
+        else:
+            completed = rng.random() < completion_probability
+            # Day 0 is a Monday, see generate_database
+            if gap_pattern == "weekdays" and periodicity == "daily" and day % 7 >= 5:
+                completed = False
+        if completed:
+            yield day
+
+
+def generate_database(path, habit_count=100, years=1, completion_probability=0.8, gap_pattern="random",
+                      daily_share=0.5, delete_percentage=0, seed=None, end_date=None, provider="python",
+                      overwrite=False):
+    """
+    Builds a habit tracker database filled with synthetic habits and executions, e.g. as a fixture for benchmarks
+    and capacity planning.
+
+    The tables are created like in database.setup_database and all executions are inserted with executemany inside a
+    single transaction, before the migrations add the indexes and triggers, so that no index or trigger has to be
+    maintained per inserted row. Afterwards the migrations are applied and the statistics of all habits are
+    calculated once.
+
+    Args:
+        path (str): The path of the database file to create.
+        habit_count (int, optional): The number of habits. Defaults to 100.
+        years (float, optional): The number of years of execution history. Defaults to 1.
+        completion_probability (float, optional): The share of periods in which a habit is completed, between
+            0 and 1. Defaults to 0.8.
+        gap_pattern (str, optional): The pattern of completions and misses, one of GAP_PATTERNS. Defaults to "random".
+        daily_share (float, optional): The share of daily habits, the remaining habits are weekly. Defaults to 0.5.
+        delete_percentage (float, optional): The percentage of executions to delete afterwards with
+            database.delete_random_executions. Defaults to 0.
+        seed (int, optional): The seed of the random number generator, for reproducible databases.
+        end_date (datetime.date, optional): The day of the latest possible execution, defaults to today.
+        provider (str, optional): The statistics provider used to calculate the statistics, see
+            database.update_database. Defaults to "python".
+        overwrite (bool, optional): Whether to replace an existing database file. Defaults to False.
+
+    Returns:
+        dict: The number of habits and executions in the database and the seconds it took to build it.
+
+    Raises:
+        FileExistsError: If the database file already exists and overwrite is False.
+        ValueError: If gap_pattern is not one of GAP_PATTERNS.
+    """
+    if gap_pattern not in GAP_PATTERNS:
+        raise ValueError(f"Unknown gap pattern {gap_pattern!r}, expected one of {', '.join(GAP_PATTERNS)}")
+
+    # Removing an existing database, including its write-ahead log
+    if os.path.exists(path):
+        if not overwrite:
+            raise FileExistsError(f"The database {path} already exists")
+        connection_manager.close_connections(path)
+        for file_path in (path, path + "-wal", path + "-shm"):
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    started = time.perf_counter()
+    rng = random.Random(seed)
+
+    # Starting the history on a Monday, so that the weekday of a day number is day % 7
+    if end_date is None:
+        end_date = datetime.date.today()
+    day_count = int(years * 365)
+    start_date = end_date - datetime.timedelta(days=day_count - 1)
+    start_date -= datetime.timedelta(days=start_date.weekday())
+    day_count = (end_date - start_date).days + 1
+    start_timestamp = analytics.datetime_to_timestamp(datetime.datetime.combine(start_date, datetime.time()))
+
+    with connection_manager.using_database(path):
+        # Retrieving the shared database connection
+        conn = connection_manager.get_connection()
+
+        # Creating a cursor
+        cursor = conn.cursor()
+
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            # Creating the tables, with the Timestamp column of migration 4 added up front, so that the migration
+            # finds all timestamps filled in already
+            database.create_tables(cursor)
+            cursor.execute("ALTER TABLE HabitExecution ADD COLUMN Timestamp INTEGER")
+
+            # Inserting the habits
+            habits = []
+            for number in range(1, habit_count + 1):
+                periodicity = "daily" if rng.random() < daily_share else "weekly"
+                habits.append((f"{periodicity.capitalize()} Habit {number}", periodicity))
+            cursor.executemany('''INSERT INTO Habit (HabitName, Periodicity, DaysSinceLastCompletion, CurrentStreak,
+                            LongestStreak, NumberOfBreaks) VALUES (?, ?, 0, 0, 0, 0)''', habits)
+
+            # Inserting the executions of every habit, the DateTime text is derived from the timestamp by SQLite
+            for habit_ID, (habit_name, periodicity) in enumerate(habits, start=1):
+                days = generate_completion_days(rng, periodicity, day_count, completion_probability, gap_pattern)
+                cursor.executemany('''INSERT INTO HabitExecution (HabitID, DateTime, Timestamp)
+                                VALUES (?1, datetime(?2, 'unixepoch'), ?2)''',
+                                   ((habit_ID, start_timestamp + day * analytics.SECONDS_PER_DAY) for day in days))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            # Closing the cursor
+            cursor.close()
+
+        # Adding the indexes, triggers and statistics columns, then thinning out and evaluating the data
+        migrations.apply_migrations()
+        if delete_percentage:
+            database.delete_random_executions(delete_percentage)
+        database.update_database(provider)
+
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM HabitExecution")
+        execution_count = cursor.fetchone()[0]
+        cursor.close()
+
+    return {"habits": habit_count, "executions": execution_count, "seconds": round(time.perf_counter() - started, 3)}
+
+
+def main(arguments=None):
+    """
+    Command line interface of the dataset generator.
+
+    Example usage:
+    - python dataset_generator.py fixture.db --habits 10000 --years 10 --pattern streaky --seed 1
+
+    Args:
+        arguments (list, optional): The command line arguments, defaults to sys.argv.
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Builds a habit tracker database filled with synthetic data.")
+    parser.add_argument("path", help="the database file to create")
+    parser.add_argument("--habits", type=int, default=100, help="number of habits (default: 100)")
+    parser.add_argument("--years", type=float, default=1, help="years of execution history (default: 1)")
+    parser.add_argument("--probability", type=float, default=0.8,
+                        help="share of periods in which a habit is completed (default: 0.8)")
+    parser.add_argument("--pattern", choices=GAP_PATTERNS, default="random",
+                        help="pattern of completions and misses (default: random)")
+    parser.add_argument("--daily-share", type=float, default=0.5, help="share of daily habits (default: 0.5)")
+    parser.add_argument("--delete-percentage", type=float, default=0,
+                        help="percentage of executions to delete at random afterwards (default: 0)")
+    parser.add_argument("--seed", type=int, help="seed for reproducible databases")
+    parser.add_argument("--provider", choices=sorted(database.STATISTICS_PROVIDERS), default="python",
+                        help="statistics provider used to calculate the statistics (default: python)")
+    parser.add_argument("--overwrite", action="store_true", help="replace an existing database file")
+    options = parser.parse_args(arguments)
+
+    summary = generate_database(options.path, options.habits, options.years, options.probability, options.pattern,
+                                options.daily_share, options.delete_percentage, options.seed,
+                                provider=options.provider, overwrite=options.overwrite)
+    print(f"Created {options.path}: {summary['habits']} habits, {summary['executions']} executions "
+          f"in {summary['seconds']} seconds")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+import collections
+import itertools
+import threading
+import connection_manager
+
+# Maximum number of databases (e.g. tenants) with a cache, the least recently used cache is dropped first
+MAX_CACHED_DATABASES = 256
+
+# Maximum number of habit rows kept per database, the least recently used rows are evicted first (None = unbounded)
+# Note that the whole cache of a database is cleared whenever the connection of the calling thread sees a commit of
+# any other connection or is new (see check_data_version). PRAGMA data_version cannot tell commits of other threads
+# of this process, which invalidate the affected entries themselves, from commits of other processes. Under the
+# threaded JSON service (see server.py), whose threads each use their own connection, every change made by one
+# request therefore clears the cache for all threads, so the cache mainly pays off for read-heavy workloads.
+HABIT_CACHE_SIZE = 10000
+
+# Lower-cases ASCII letters only, like the NOCASE collation of SQLite that is used to look up habits by name
+NOCASE_TRANSLATION = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+# The caches are shared by all threads, so every access is guarded by this lock
+cache_lock = threading.Lock()
+
+# Caches keyed by database path, the most recently used last
+habit_caches = collections.OrderedDict()
+
+# Source of cache generations, unique across all caches so that a cache that was cleared and created again never
+# reuses the generation of its predecessor
+generations = itertools.count(1)
+
+# The connection and the PRAGMA data_version it last reported, for every database used by a thread
+thread_local_storage = threading.local()
+
+
+class HabitCache:
+    """
+    In-memory copy of the habit names, the IDs of recently looked up habit names and of recently used Habit rows
+    of one database.
+
+    The generation changes whenever cached data is invalidated. Data read from the database is only stored if the
+    generation is still the one from before the read (see get_generation), so that a read that overlapped with a
+    change cannot put outdated data back into the cache.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.generation = next(generations)
+        self.habit_names = None
+        self.habit_IDs = collections.OrderedDict()
+        self.habits = collections.OrderedDict()
+
+
+def get_cache():
+    """
+    Returns the cache of the current database (see connection_manager.get_database_path), creating it on first use.
+    The caller has to hold cache_lock.
+
+    Returns:
+        HabitCache: The cache of the current database.
+    """
+    path = connection_manager.get_database_path()
+    cache = habit_caches.get(path)
+    if cache is None:
+        cache = HabitCache(HABIT_CACHE_SIZE)
+        habit_caches[path] = cache
+        while len(habit_caches) > MAX_CACHED_DATABASES:
+            habit_caches.popitem(last=False)
+    else:
+        habit_caches.move_to_end(path)
+    return cache
+
+
+def get_name_key(habit_name):
+    """
+    Returns the key under which a habit is cached, which is equal for all spellings of a habit name that SQLite
+    considers equal with COLLATE NOCASE.
+
+    Args:
+        habit_name (str): The name of the habit.
+
+    Returns:
+        str: The cache key of the habit.
+    """
+    return habit_name.translate(NOCASE_TRANSLATION)
+
+
+def check_data_version(conn):
+    """
+    Clears the cache of the current database if the database was changed by another connection, e.g. by another
+    thread or process, since the given connection last checked. Changes made through the database functions of
+    this process invalidate the affected entries themselves. The data version is only comparable within one
+    connection, so the cache is also cleared when the thread uses a new connection, e.g. after its previous one was
+    closed by connection_manager. Commits of other threads of this process clear the cache as well, see
+    HABIT_CACHE_SIZE.
+
+    Args:
+        conn (sqlite3.Connection): The connection of the calling thread to the current database.
+
+    Returns:
+        None
+    """
+    data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+    data_versions = getattr(thread_local_storage, "data_versions", None)
+    if data_versions is None:
+        data_versions = collections.OrderedDict()
+        thread_local_storage.data_versions = data_versions
+
+    path = connection_manager.get_database_path()
+    if data_versions.get(path) != (conn, data_version):
+        data_versions[path] = (conn, data_version)
+        clear()
+    data_versions.move_to_end(path)
+    while len(data_versions) > MAX_CACHED_DATABASES:
+        data_versions.popitem(last=False)
+
+
+def get_generation():
+    """
+    Returns the generation of the cache of the current database. It has to be retrieved before data is read from the
+    database and passed to the function that stores the data.
+
+    Returns:
+        int: The current generation of the cache.
+    """
+    with cache_lock:
+        return get_cache().generation
+
+
+def get_habit_names():
+    """
+    Returns the cached habit names of the current database.
+
+    Returns:
+        list: A copy of the cached habit names, or None if they are not cached.
+    """
+    with cache_lock:
+        habit_names = get_cache().habit_names
+        return None if habit_names is None else list(habit_names)
+
+
+def store_habit_names(habit_names, generation):
+    """
+    Caches the habit names of the current database, unless the cache was invalidated since they were read.
+
+    Args:
+        habit_names (list): The names of all habits, in the order in which they are returned.
+        generation (int): The generation of the cache before the names were read, see get_generation.
+
+    Returns:
+        None
+    """
+    with cache_lock:
+        cache = get_cache()
+        if cache.generation == generation:
+            cache.habit_names = list(habit_names)
+
+
+def get_habit_ID(habit_name):
+    """
+    Returns the cached ID of the habit with the given name and marks it as recently used.
+
+    Args:
+        habit_name (str): The name of the habit, compared case-insensitively.
+
+    Returns:
+        int: The ID of the habit, or None if it is not cached.
+    """
+    key = get_name_key(habit_name)
+    with cache_lock:
+        habit_IDs = get_cache().habit_IDs
+        habit_ID = habit_IDs.get(key)
+        if habit_ID is not None:
+            habit_IDs.move_to_end(key)
+        return habit_ID
+
+
+def store_habit_ID(habit_name, habit_ID, generation):
+    """
+    Caches the ID of the habit with the given name, unless the cache was invalidated since it was read. The least
+    recently used IDs are evicted if the cache is full. Habit names never change, so the ID stays valid until the
+    habit is deleted.
+
+    Args:
+        habit_name (str): The name of the habit.
+        habit_ID (int): The ID of the habit.
+        generation (int): The generation of the cache before the ID was read, see get_generation.
+
+    Returns:
+        None
+    """
+    key = get_name_key(habit_name)
+    with cache_lock:
+        cache = get_cache()
+        if cache.generation != generation:
+            return
+        cache.habit_IDs[key] = habit_ID
+        cache.habit_IDs.move_to_end(key)
+        while cache.max_size is not None and len(cache.habit_IDs) > cache.max_size:
+            cache.habit_IDs.popitem(last=False)
+
+
+def get_habit(habit_name):
+    """
+    Returns the cached Habit row of the habit with the given name and marks it as recently used.
+
+    Args:
+        habit_name (str): The name of the habit, compared case-insensitively.
+
+    Returns:
+        tuple: The cached habit row, or None if it is not cached.
+    """
+    key = get_name_key(habit_name)
+    with cache_lock:
+        habits = get_cache().habits
+        habit_row = habits.get(key)
+        if habit_row is not None:
+            habits.move_to_end(key)
+        return habit_row
+
+
+def store_habit(habit_row, generation):
+    """
+    Caches a Habit row, unless the cache was invalidated since it was read. The least recently used rows are evicted
+    if the cache is full.
+
+    Args:
+        habit_row (tuple): The habit row, in the order of HABIT_COLUMNS of the database module.
+        generation (int): The generation of the cache before the row was read, see get_generation.
+
+    Returns:
+        None
+    """
+    key = get_name_key(habit_row[1])
+    with cache_lock:
+        cache = get_cache()
+        if cache.generation != generation:
+            return
+        cache.habits[key] = habit_row
+        cache.habits.move_to_end(key)
+        while cache.max_size is not None and len(cache.habits) > cache.max_size:
+            cache.habits.popitem(last=False)
+
+
+def invalidate_habit_names():
+    """
+    Removes the cached habit names of the current database, e.g. after a habit was created or deleted.
+
+    Returns:
+        None
+    """
+    with cache_lock:
+        cache = get_cache()
+        cache.generation = next(generations)
+        cache.habit_names = None
+
+
+def invalidate_habits(habit_name=None, habit_ID=None):
+    """
+    Removes cached Habit rows of the current database, e.g. after the statistics of habits were updated.
+
+    Args:
+        habit_name (str, optional): The name of the habit to remove.
+        habit_ID (int, optional): The ID of the habit to remove.
+        If neither is given, all habits are removed.
+
+    Returns:
+        None
+    """
+    with cache_lock:
+        cache = get_cache()
+        cache.generation = next(generations)
+        habits = cache.habits
+        if habit_name is not None:
+            habits.pop(get_name_key(habit_name), None)
+        elif habit_ID is not None:
+            for key in [key for key, habit_row in habits.items() if habit_row[0] == habit_ID]:
+                del habits[key]
+        else:
+            habits.clear()
+
+
+def invalidate_habit_ID(habit_ID):
+    """
+    Removes everything cached for a habit of the current database, e.g. after the habit was deleted.
+
+    Args:
+        habit_ID (int): The ID of the habit.
+
+    Returns:
+        None
+    """
+    invalidate_habits(habit_ID=habit_ID)
+    with cache_lock:
+        cache = get_cache()
+        cache.generation = next(generations)
+        cache.habit_names = None
+        for key in [key for key, cached_ID in cache.habit_IDs.items() if cached_ID == habit_ID]:
+            del cache.habit_IDs[key]
+
+
+def clear():
+    """
+    Removes everything cached for the current database.
+
+    Returns:
+        None
+    """
+    with cache_lock:
+        habit_caches.pop(connection_manager.get_database_path(), None)
@@ -0,0 +1,347 @@
+import datetime
+import analytics
+import connection_manager
+import database
+
+
+# Migrations
+# Every migration receives a cursor and has to be idempotent, so that it can safely run against databases which
+# already contain (parts of) the change, e.g. databases that were upgraded by hand.
+def create_habit_execution_index(cursor):
+    """
+    Adds a composite index on HabitExecution (HabitID, DateTime), so that the execution history of a single habit can
+    be read in DateTime order without scanning and sorting the whole table.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor used to execute the migration.
+
+    Returns:
+        None
+    """
+    cursor.execute('''CREATE INDEX IF NOT EXISTS HabitExecutionByHabitAndDateTime
+                    ON HabitExecution (HabitID, DateTime)''')
+
+
+def create_habit_name_index(cursor):
+    """
+    Adds a unique, case-insensitive index on Habit (HabitName), which speeds up the lookup of habits by name and
+    guarantees that no two habits share the same name regardless of case.
+
+    The NOCASE collation of SQLite only folds the ASCII letters A-Z, so e.g. "Ärger" and "ärger" remain two different
+    names. Habits of older databases whose names only differ in the case of ASCII letters are merged before the index
+    is created: the executions of all such habits are moved to the habit with the lowest ID, whose name and
+    periodicity are kept, and the other habits are deleted. Executions that exist for both habits are kept once.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor used to execute the migration.
+
+    Returns:
+        None
+    """
+    # Finding the habits that would violate the index, together with the habit they are merged into
+    cursor.execute('''SELECT h.ID, (SELECT MIN(ID) FROM Habit WHERE HabitName = h.HabitName COLLATE NOCASE) AS KeptID
+                    FROM Habit h WHERE h.ID > KeptID''')
+    duplicates = cursor.fetchall()
+
+    # Merging the duplicates
+    cursor.executemany("UPDATE HabitExecution SET HabitID = ? WHERE HabitID = ?",
+                       [(kept_ID, habit_ID) for habit_ID, kept_ID in duplicates])
+    cursor.executemany("DELETE FROM Habit WHERE ID = ?", [(habit_ID,) for habit_ID, kept_ID in duplicates])
+    cursor.executemany('''DELETE FROM HabitExecution WHERE HabitID = ?1 AND rowid NOT IN
+                       (SELECT MIN(rowid) FROM HabitExecution WHERE HabitID = ?1 GROUP BY DateTime)''',
+                       [(kept_ID,) for kept_ID in sorted({kept_ID for habit_ID, kept_ID in duplicates})])
+
+    cursor.execute('''CREATE UNIQUE INDEX IF NOT EXISTS HabitByName
+                    ON Habit (HabitName COLLATE NOCASE)''')
+
+
+def add_last_completion_column(cursor):
+    """
+    Adds the LastCompletion column to the Habit table. It holds the latest execution that is reflected in the stored
+    statistics of a habit, which allows a completion to update the statistics incrementally. The column starts out
+    empty, so the statistics of existing habits are recalculated once on their next completion.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor used to execute the migration.
+
+    Returns:
+        None
+    """
+    cursor.execute("PRAGMA table_info(Habit)")
+    if "LastCompletion" not in [column[1] for column in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE Habit ADD COLUMN LastCompletion TEXT")
+
+
+def add_execution_timestamp_column(cursor):
+    """
+    Stores every execution additionally as an integer timestamp (seconds since 1970-01-01, see
+    analytics.datetime_to_timestamp), so that gaps between executions can be calculated by integer subtraction instead
+    of parsing the DateTime text of every row.
+
+    Existing executions are converted in place, the index on (HabitID, DateTime) is replaced by one on
+    (HabitID, Timestamp), and a trigger fills in the timestamp of executions that are inserted with DateTime only.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor used to execute the migration.
+
+    Returns:
+        None
+    """
+    cursor.execute("PRAGMA table_info(HabitExecution)")
+    if "Timestamp" not in [column[1] for column in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE HabitExecution ADD COLUMN Timestamp INTEGER")
+    cursor.execute('''UPDATE HabitExecution SET Timestamp = CAST(strftime('%s', DateTime) AS INTEGER)
+                    WHERE Timestamp IS NULL''')
+    cursor.execute("DROP INDEX IF EXISTS HabitExecutionByHabitAndDateTime")
+    cursor.execute('''CREATE INDEX IF NOT EXISTS HabitExecutionByHabitAndTimestamp
+                    ON HabitExecution (HabitID, Timestamp)''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS HabitExecutionTimestamp
+                    AFTER INSERT ON HabitExecution WHEN NEW.Timestamp IS NULL
+                    BEGIN
+                        UPDATE HabitExecution SET Timestamp = CAST(strftime('%s', NEW.DateTime) AS INTEGER)
+                        WHERE rowid = NEW.rowid;
+                    END''')
+
+
+def add_statistics_tracking_columns(cursor):
+    """
+    Adds the StatsUpdatedAt and StatsDirty columns to the Habit table, so that only habits whose statistics are out
+    of date have to be recalculated.
+
+    StatsUpdatedAt holds the timestamp of the last recalculation. StatsDirty is set by triggers whenever an execution
+    of the habit is inserted or deleted, and cleared when the statistics are recalculated. Existing habits start out
+    dirty.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor used to execute the migration.
+
+    Returns:
+        None
+    """
+    cursor.execute("PRAGMA table_info(Habit)")
+    columns = [column[1] for column in cursor.fetchall()]
+    if "StatsUpdatedAt" not in columns:
+        cursor.execute("ALTER TABLE Habit ADD COLUMN StatsUpdatedAt INTEGER")
+    if "StatsDirty" not in columns:
+        cursor.execute("ALTER TABLE Habit ADD COLUMN StatsDirty INTEGER NOT NULL DEFAULT 1")
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS HabitExecutionInsertMarksStatsDirty
+                    AFTER INSERT ON HabitExecution
+                    BEGIN
+                        UPDATE Habit SET StatsDirty = 1 WHERE ID = NEW.HabitID;
+                    END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS HabitExecutionDeleteMarksStatsDirty
+                    AFTER DELETE ON HabitExecution
+                    BEGIN
+                        UPDATE Habit SET StatsDirty = 1 WHERE ID = OLD.HabitID;
+                    END''')
+
+
+def create_habit_sort_indexes(cursor):
+    """
+    Adds indexes on the columns the habit lists are sorted by (see sql_query_habits in the database module), so that
+    a page of a sorted habit list is read from the index instead of sorting the whole Habit table. Every index also
+    contains the ID, which breaks ties between habits with the same value.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor used to execute the migration.
+
+    Returns:
+        None
+    """
+    cursor.execute("CREATE INDEX IF NOT EXISTS HabitByHabitName ON Habit (HabitName)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS HabitByNumberOfBreaks ON Habit (NumberOfBreaks)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS HabitByCurrentStreak ON Habit (CurrentStreak)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS HabitByLongestStreak ON Habit (LongestStreak)")
+
+
+# Rollup tables of HabitExecution: (table, period column, period length in seconds, offset of the period numbering)
+# There is no daily rollup: executions are limited to one per day, so it would have as many rows as HabitExecution.
+EXECUTION_ROLLUPS = [
+    ("HabitExecutionWeekly", "Week", analytics.SECONDS_PER_WEEK, analytics.WEEK_OFFSET),
+]
+
+
+def create_execution_rollups(cursor):
+    """
+    Adds the HabitExecutionWeekly table, which holds the number of executions and the first and last execution
+    timestamp of every habit per ISO week. The streak statistics of weekly habits can be calculated from this rollup
+    alone (see analytics.calculate_habit_statistics_from_rollups), which has up to seven times fewer rows than
+    HabitExecution for weekly habits that are completed on several days a week.
+
+    The rollups are filled from the existing executions and kept up to date by triggers on every insert, update and
+    delete of an execution. When an execution is removed, the first and last timestamp of its period are looked up
+    again with the (HabitID, Timestamp) index, but only if the removed execution was one of them.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor used to execute the migration.
+
+    Returns:
+        None
+    """
+    for table, period_column, period_length, offset in EXECUTION_ROLLUPS:
+        cursor.execute(f'''CREATE TABLE IF NOT EXISTS {table}
+                        (HabitID INTEGER, {period_column} INTEGER, ExecutionCount INTEGER, FirstTimestamp INTEGER,
+                        LastTimestamp INTEGER, PRIMARY KEY (HabitID, {period_column})) WITHOUT ROWID''')
+
+        # Rebuilding the rollup from the existing executions
+        cursor.execute(f"DELETE FROM {table}")
+        cursor.execute(f'''INSERT INTO {table} (HabitID, {period_column}, ExecutionCount, FirstTimestamp, LastTimestamp)
+                        SELECT HabitID, (Timestamp + {offset}) / {period_length}, COUNT(*), MIN(Timestamp),
+                        MAX(Timestamp) FROM HabitExecution WHERE Timestamp IS NOT NULL
+                        GROUP BY HabitID, (Timestamp + {offset}) / {period_length}''')
+
+        # Statements adding the NEW execution to and removing the OLD execution from its period
+        period = "({row}.Timestamp + %d) / %d" % (offset, period_length)
+        add_execution = f'''INSERT INTO {table} (HabitID, {period_column}, ExecutionCount, FirstTimestamp,
+                                LastTimestamp)
+                            SELECT NEW.HabitID, {period.format(row="NEW")}, 1, NEW.Timestamp, NEW.Timestamp
+                            WHERE NEW.Timestamp IS NOT NULL
+                            ON CONFLICT (HabitID, {period_column}) DO UPDATE SET
+                                ExecutionCount = ExecutionCount + 1,
+                                FirstTimestamp = MIN(FirstTimestamp, excluded.FirstTimestamp),
+                                LastTimestamp = MAX(LastTimestamp, excluded.LastTimestamp);'''
+        period_executions = f'''FROM HabitExecution WHERE HabitID = OLD.HabitID
+                                AND Timestamp >= {period.format(row="OLD")} * {period_length} - {offset}
+                                AND Timestamp < ({period.format(row="OLD")} + 1) * {period_length} - {offset}'''
+        remove_execution = f'''UPDATE {table} SET
+                                ExecutionCount = ExecutionCount - 1,
+                                FirstTimestamp = CASE WHEN FirstTimestamp = OLD.Timestamp
+                                    THEN (SELECT MIN(Timestamp) {period_executions}) ELSE FirstTimestamp END,
+                                LastTimestamp = CASE WHEN LastTimestamp = OLD.Timestamp
+                                    THEN (SELECT MAX(Timestamp) {period_executions}) ELSE LastTimestamp END
+                            WHERE HabitID = OLD.HabitID AND {period_column} = {period.format(row="OLD")};
+                            DELETE FROM {table} WHERE HabitID = OLD.HabitID
+                                AND {period_column} = {period.format(row="OLD")} AND ExecutionCount <= 0;'''
+
+        cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS {table}Insert
+                        AFTER INSERT ON HabitExecution
+                        BEGIN
+                            {add_execution}
+                        END''')
+        cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS {table}Delete
+                        AFTER DELETE ON HabitExecution
+                        BEGIN
+                            {remove_execution}
+                        END''')
+        cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS {table}Update
+                        AFTER UPDATE OF HabitID, Timestamp ON HabitExecution
+                        BEGIN
+                            {remove_execution}
+                            {add_execution}
+                        END''')
+
+
+# Ordered list of all migrations: (version, description, migration function)
+MIGRATIONS = [
+    (1, "Index HabitExecution by HabitID and DateTime", create_habit_execution_index),
+    (2, "Unique case-insensitive index on HabitName", create_habit_name_index),
+    (3, "LastCompletion column on Habit", add_last_completion_column),
+    (4, "Integer Timestamp column on HabitExecution", add_execution_timestamp_column),
+    (5, "Statistics tracking columns on Habit", add_statistics_tracking_columns),
+    (6, "Indexes for sorting habit lists", create_habit_sort_indexes),
+    (7, "Weekly execution rollup table", create_execution_rollups),
+]
+
+
+def get_schema_version(cursor):
+    """
+    Retrieves the version of the latest migration applied to the database.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor used to query the database.
+
+    Returns:
+        int: The current schema version, 0 if no migration has been applied yet.
+    """
+    cursor.execute('''CREATE TABLE IF NOT EXISTS SchemaVersion
+                    (Version INTEGER PRIMARY KEY, Description TEXT, AppliedAt TEXT)''')
+    cursor.execute("SELECT MAX(Version) FROM SchemaVersion")
+    version = cursor.fetchone()[0]
+    return version or 0
+
+
+def apply_migrations(conn=None):
+    """
+    Upgrades the habit tracker database in place by applying all migrations that have not been applied yet.
+
+    Each migration runs in its own transaction together with the SchemaVersion entry recording it, so a failing
+    migration leaves the database at the previous version. Connections that upgrade the same database concurrently
+    apply every migration once. The Habit and HabitExecution tables have to exist already (see setup_database in the
+    database module).
+
+    Args:
+        conn (sqlite3.Connection, optional): The connection to migrate, defaults to the shared database connection.
+
+    Returns:
+        int: The schema version of the database after the upgrade.
+    """
+    # Retrieving the shared database connection
+    if conn is None:
+        conn = connection_manager.get_connection()
+
+    # Creating a cursor
+    cursor = conn.cursor()
+
+    # Checking which migrations are still outstanding
+    version = get_schema_version(cursor)
+    conn.commit()
+
+    for migration_version, description, migration in MIGRATIONS:
+        if migration_version <= version:
+            continue
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            # Skipping migrations that another connection applied since the version was checked
+            if get_schema_version(cursor) >= migration_version:
+                conn.rollback()
+                version = migration_version
+                continue
+            migration(cursor)
+            cursor.execute("INSERT INTO SchemaVersion (Version, Description, AppliedAt) VALUES (?, ?, ?)",
+                           (migration_version, description, datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        version = migration_version
+
+    # Closing the cursor
+    cursor.close()
+
+    return version
+
+
+def initialize_database(conn=None):
+    """
+    Creates the tables of the current database (see connection_manager.using_database) if they do not exist yet and
+    upgrades its schema to the latest version, e.g. for the database of a new tenant or an import into a new file.
+    Unlike database.setup_database, no sample data is inserted.
+
+    Args:
+        conn (sqlite3.Connection, optional): The connection to initialize, defaults to the shared database connection.
+
+    Returns:
+        int: The schema version of the database after the upgrade.
+    """
+    # Retrieving the shared database connection
+    if conn is None:
+        conn = connection_manager.get_connection()
+
+    # Creating a cursor
+    cursor = conn.cursor()
+
+    # Creating the tables of a new database
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'Habit'")
+        if cursor.fetchone() is None:
+            database.create_tables(cursor)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        # Closing the cursor
+        cursor.close()
+
+    return apply_migrations(conn)
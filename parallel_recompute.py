@@ -0,0 +1,178 @@
+import argparse
+import datetime
+import multiprocessing
+import os
+import time
+import connection_manager
+import database
+import habit_cache
+import tenants
+
+# Number of habits whose statistics a worker process calculates per task
+CHUNK_SIZE = 1000
+
+
+def get_pool(workers):
+    """
+    Creates a pool of worker processes. The processes are spawned instead of forked, so that they do not inherit the
+    open database connections of the parent process.
+
+    Args:
+        workers (int): The number of worker processes, None for one per CPU core.
+
+    Returns:
+        multiprocessing.pool.Pool: The pool of worker processes.
+    """
+    return multiprocessing.get_context("spawn").Pool(workers)
+
+
+def calculate_statistics_chunk(task):
+    """
+    Calculates the statistics of a chunk of habits in a worker process, without writing them.
+
+    Args:
+        task (tuple): The database path, the IDs of the habits, the point in time and the statistics provider.
+
+    Returns:
+        tuple: The habit IDs and the list of statistics rows (see database.STATISTICS_PROVIDERS).
+    """
+    path, habit_IDs, now, provider = task
+    with connection_manager.using_database(path):
+        return habit_IDs, list(database.STATISTICS_PROVIDERS[provider](now, habit_IDs))
+
+
+def recompute_database(path=None, workers=None, chunk_size=CHUNK_SIZE, provider="python"):
+    """
+    Recalculates the statistics of all habits of one database in parallel.
+
+    The habits are split into chunks of chunk_size habits, whose statistics are calculated by a pool of worker
+    processes. The habits are marked before (see database.mark_habits_recalculating) and the parent process writes the
+    results of every chunk in its own transaction (see database.store_habit_statistics). Only the habits that were
+    changed by another connection since they were marked are recalculated inside the write transaction, so that
+    concurrent completions are never overwritten with outdated statistics.
+
+    Args:
+        path (str, optional): The database file, defaults to the current database (see connection_manager).
+        workers (int, optional): The number of worker processes, defaults to one per CPU core.
+        chunk_size (int, optional): The number of habits per task. Defaults to CHUNK_SIZE.
+        provider (str, optional): The statistics provider, see database.update_database. Defaults to "python".
+
+    Returns:
+        int: The number of habits that were updated.
+    """
+    if path is None:
+        path = connection_manager.get_database_path()
+    path = os.path.abspath(path)
+
+    with connection_manager.using_database(path):
+        # Retrieving the shared database connection
+        conn = connection_manager.get_connection()
+
+        # Creating a cursor
+        cursor = conn.cursor()
+
+        # Marking the habits, so that the habits changed during the recalculation are detected when they are written
+        cursor.execute("SELECT ID FROM Habit ORDER BY ID")
+        habit_IDs = [row[0] for row in cursor]
+        database.mark_habits_recalculating(cursor, habit_IDs)
+        now = datetime.datetime.now()
+
+        # Calculating the chunks in parallel and writing each one as soon as it is finished
+        tasks = [(path, habit_IDs[start:start + chunk_size], now, provider)
+                 for start in range(0, len(habit_IDs), chunk_size)]
+        updated_habits = 0
+        try:
+            with get_pool(workers) as pool:
+                for chunk_habit_IDs, statistics_rows in pool.imap_unordered(calculate_statistics_chunk, tasks):
+                    database.store_habit_statistics(cursor, statistics_rows, now, provider)
+                    updated_habits += len(chunk_habit_IDs)
+        finally:
+            # Closing the cursor
+            cursor.close()
+
+            # Removing the outdated habit rows from the cache
+            habit_cache.invalidate_habits()
+
+    return updated_habits
+
+
+def recompute_tenant(task):
+    """
+    Recalculates the statistics of all habits of one tenant in a worker process.
+
+    Args:
+        task (tuple): The ID of the tenant, the tenant directory and the statistics provider.
+
+    Returns:
+        tuple: The ID of the tenant and the number of its habits.
+    """
+    tenant_ID, tenant_directory, provider = task
+    tenants.TENANT_DIRECTORY = tenant_directory
+    with tenants.using_tenant(tenant_ID):
+        database.update_database(provider)
+        habit_count = connection_manager.get_connection().execute("SELECT COUNT(*) FROM Habit").fetchone()[0]
+    connection_manager.close_connections(tenants.get_tenant_path(tenant_ID))
+    return tenant_ID, habit_count
+
+
+def recompute_tenants(tenant_IDs=None, workers=None, chunk_size=1, provider="python"):
+    """
+    Recalculates the statistics of all habits of many tenants in parallel, one tenant database per task. The tenant
+    databases are independent files, so the worker processes write them without waiting for each other.
+
+    Args:
+        tenant_IDs (list, optional): The tenants to update, defaults to all tenants (see tenants.list_tenants).
+        workers (int, optional): The number of worker processes, defaults to one per CPU core.
+        chunk_size (int, optional): The number of tenants handed to a worker process at once. Defaults to 1.
+        provider (str, optional): The statistics provider, see database.update_database. Defaults to "python".
+
+    Returns:
+        dict: The number of updated habits of every tenant.
+    """
+    if tenant_IDs is None:
+        tenant_IDs = tenants.list_tenants()
+    tenant_directory = os.path.abspath(tenants.TENANT_DIRECTORY)
+    tasks = [(tenant_ID, tenant_directory, provider) for tenant_ID in tenant_IDs]
+
+    with get_pool(workers) as pool:
+        return dict(pool.imap_unordered(recompute_tenant, tasks, chunksize=chunk_size))
+
+
+def main(arguments=None):
+    """
+    Command line interface of the parallel recalculation, e.g. for a nightly refresh.
+
+    Example usage:
+    - python parallel_recompute.py --database habit_tracker.db --workers 8 --chunk-size 5000
+    - python parallel_recompute.py --tenants
+
+    Args:
+        arguments (list, optional): The command line arguments, defaults to sys.argv.
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Recalculates the habit statistics using all CPU cores.")
+    parser.add_argument("--database", help="database file to update (default: habit_tracker.db)")
+    parser.add_argument("--tenants", action="store_true", help="update the databases of all tenants instead")
+    parser.add_argument("--workers", type=int, help="number of worker processes (default: one per CPU core)")
+    parser.add_argument("--chunk-size", type=int,
+                        help=f"habits per task (default: {CHUNK_SIZE}), "
+                             f"or tenants per task with --tenants (default: 1)")
+    parser.add_argument("--provider", choices=sorted(database.STATISTICS_PROVIDERS), default="python",
+                        help="statistics provider (default: python)")
+    options = parser.parse_args(arguments)
+
+    started = time.perf_counter()
+    if options.tenants:
+        habit_counts = recompute_tenants(None, options.workers, options.chunk_size or 1, options.provider)
+        summary = f"{sum(habit_counts.values())} habits of {len(habit_counts)} tenants"
+    else:
+        habit_count = recompute_database(options.database, options.workers, options.chunk_size or CHUNK_SIZE,
+                                         options.provider)
+        summary = f"{habit_count} habits"
+    print(f"Updated {summary} in {time.perf_counter() - started:.3f} seconds")
+
+
+if __name__ == "__main__":
+    main()
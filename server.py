@@ -0,0 +1,270 @@
+import argparse
+import concurrent.futures
+import contextlib
+import contextvars
+import datetime
+import http.server
+import json
+import os
+import urllib.parse
+import connection_manager
+import controller
+import database
+import tenants
+
+# Number of threads handling requests. The threads are reused, so every thread keeps its database connection open.
+SERVER_WORKERS = 16
+
+# Habit list views of the analytics endpoint: /analytics/<view>
+ANALYTICS_VIEWS = {
+    "by_ID": controller.give_habit_list_by_ID,
+    "daily": controller.give_habit_list_daily,
+    "weekly": controller.give_habit_list_weekly,
+    "by_break_count": controller.give_habit_list_by_break_count,
+    "by_current_streak": controller.give_habit_list_by_current_streak,
+    "by_longest_streak": controller.give_habit_list_by_longest_streak,
+}
+
+# Keys of the habit objects returned by the service, in the order of database.HABIT_COLUMNS
+HABIT_KEYS = database.HABIT_COLUMNS.split(", ")
+
+
+def habit_row_to_dict(habit_row):
+    """
+    Converts a habit row as returned by the controller into a JSON object.
+
+    Args:
+        habit_row (tuple): The habit row, in the order of database.HABIT_COLUMNS.
+
+    Returns:
+        dict: The habit data keyed by column name.
+    """
+    return dict(zip(HABIT_KEYS, habit_row))
+
+
+class HabitTrackerServer(http.server.ThreadingHTTPServer):
+    """
+    HTTP server handling every request on a bounded pool of reusable threads instead of a new thread per request, so
+    that the per-thread database connections of connection_manager are reused across requests. Every connection is
+    closed after its response (see HabitRequestHandler.send_json), so that idle keep-alive clients do not occupy the
+    threads of the pool.
+    """
+
+    def __init__(self, server_address, request_handler_class, workers=SERVER_WORKERS):
+        super().__init__(server_address, request_handler_class)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="HabitServer")
+
+    def process_request(self, request, client_address):
+        # Handling the request in a copy of the current context, so that connection_manager.using_database applies
+        context = contextvars.copy_context()
+        self.executor.submit(context.run, self.process_request_thread, request, client_address)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
+class HabitRequestHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Maps the endpoints of the JSON service onto the controller functions.
+
+    Endpoints:
+    - GET /habits: the names of all habits
+    - GET /habits/page?periodicity=&sort_key=&descending=&limit=&after=: one page of habit data
+    - GET /analytics/<view>: a habit list, see ANALYTICS_VIEWS
+    - POST /habits {"name": ..., "periodicity": "daily" | "weekly"}: creates a habit
+    - POST /habits/<name>/completions: completes a habit for today
+    - POST /completions {"completions": [[name, timestamp], ...]}: records a batch of completions
+    - DELETE /habits/<name>: deletes a habit
+
+    Requests with an X-User-ID header are routed to the database of that user (see tenants.using_tenant).
+    """
+
+    server_version = "HabitTracker/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def send_json(self, status, payload=None):
+        """
+        Sends a JSON response and closes the connection afterwards, which frees the thread for the next request.
+
+        Args:
+            status (int): The HTTP status code.
+            payload (optional): The JSON serializable response body, no body is sent if it is None.
+        """
+        body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Connection", "close")
+        self.close_connection = True
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        """
+        Reads the JSON request body.
+
+        Returns:
+            The decoded request body, or an empty dict if there is none.
+        """
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def get_path_parts(self):
+        """
+        Splits the request path into its decoded segments and the parsed query string.
+
+        Returns:
+            tuple: The list of path segments and the dict of query parameters.
+        """
+        url = urllib.parse.urlsplit(self.path)
+        parts = [urllib.parse.unquote(part) for part in url.path.split("/") if part]
+        return parts, dict(urllib.parse.parse_qsl(url.query))
+
+    def handle_request(self, handler):
+        """
+        Runs a handler method, on the database of the requesting user if the request names one, and turns invalid
+        requests and unexpected errors into JSON error responses.
+
+        Args:
+            handler (callable): The handler method, called with the path segments and query parameters.
+        """
+        try:
+            parts, query = self.get_path_parts()
+            tenant_ID = self.headers.get("X-User-ID")
+            with tenants.using_tenant(tenant_ID) if tenant_ID else contextlib.nullcontext():
+                handler(parts, query)
+        except (ValueError, KeyError, TypeError) as error:
+            self.send_json(400, {"error": str(error)})
+        except Exception as error:
+            self.send_json(500, {"error": str(error)})
+
+    def do_GET(self):
+        self.handle_request(self.handle_get)
+
+    def do_POST(self):
+        self.handle_request(self.handle_post)
+
+    def do_DELETE(self):
+        self.handle_request(self.handle_delete)
+
+    def handle_get(self, parts, query):
+        if parts == ["habits"]:
+            self.send_json(200, {"habits": controller.get_habit_list()})
+        elif parts == ["habits", "page"]:
+            after = json.loads(query["after"]) if query.get("after") else None
+            habit_rows, next_page = controller.give_habit_page(
+                periodicity=query.get("periodicity") or None,
+                sort_key=query.get("sort_key", "HabitName"),
+                descending=query.get("descending", "false").lower() in ("1", "true"),
+                limit=int(query["limit"]) if query.get("limit") else None,
+                after=tuple(after) if after is not None else None)
+            self.send_json(200, {"habits": [habit_row_to_dict(row) for row in habit_rows], "next": next_page})
+        elif len(parts) == 2 and parts[0] == "analytics" and parts[1] in ANALYTICS_VIEWS:
+            habit_rows = ANALYTICS_VIEWS[parts[1]]()
+            self.send_json(200, {"habits": [habit_row_to_dict(row) for row in habit_rows]})
+        else:
+            self.send_json(404, {"error": "Not found"})
+
+    def handle_post(self, parts, query):
+        if parts == ["habits"]:
+            request = self.read_json()
+            name, periodicity = str(request["name"]).strip(), request["periodicity"]
+            if not name or periodicity not in ("daily", "weekly"):
+                raise ValueError("A habit needs a name and the periodicity 'daily' or 'weekly'")
+            create_habit = controller.create_daily_habit if periodicity == "daily" else controller.create_weekly_habit
+            if create_habit(name):
+                self.send_json(409, {"error": f"Habit {name} already exists"})
+            else:
+                self.send_json(201, {"name": name, "periodicity": periodicity})
+        elif len(parts) == 3 and parts[0] == "habits" and parts[2] == "completions":
+            # Resolving the habit name once, for the existence check and the completion
+            habit_ID = database.sql_get_habit_ID(parts[1])
+            if habit_ID is None:
+                self.send_json(404, {"error": f"Habit {parts[1]} does not exist"})
+            elif database.sql_complete_habit_by_ID(habit_ID):
+                self.send_json(201, {"name": parts[1], "completed": True})
+            else:
+                self.send_json(409, {"error": f"Habit {parts[1]} was already completed today"})
+        elif parts == ["completions"]:
+            completions = [(str(name), int(timestamp)) for name, timestamp in self.read_json()["completions"]]
+            recorded, rejected = controller.complete_habits(completions)
+            self.send_json(200, {"recorded": recorded, "rejected": [list(completion) for completion in rejected]})
+        else:
+            self.send_json(404, {"error": "Not found"})
+
+    def handle_delete(self, parts, query):
+        if len(parts) == 2 and parts[0] == "habits":
+            habit_ID = database.sql_get_habit_ID(parts[1])
+            if habit_ID is None:
+                self.send_json(404, {"error": f"Habit {parts[1]} does not exist"})
+            else:
+                database.sql_delete_habit_by_ID(habit_ID)
+                self.send_json(204)
+        else:
+            self.send_json(404, {"error": "Not found"})
+
+    def log_message(self, format, *args):
+        # Logging requests only if the server runs with --verbose
+        if getattr(self.server, "verbose", False):
+            super().log_message(format, *args)
+
+
+def run_server(host="127.0.0.1", port=8000, path=None, workers=SERVER_WORKERS, verbose=False):
+    """
+    Serves the habit tracker database as JSON service until the process is interrupted. The database is created with
+    sample data (see controller.create_database) if it does not exist yet.
+
+    Args:
+        host (str, optional): The address to listen on. Defaults to "127.0.0.1".
+        port (int, optional): The port to listen on. Defaults to 8000.
+        path (str, optional): The database file to serve, defaults to connection_manager.DATABASE_PATH.
+        workers (int, optional): The number of request handling threads. Defaults to SERVER_WORKERS.
+        verbose (bool, optional): Whether to log every request. Defaults to False.
+
+    Returns:
+        None
+    """
+    if path is None:
+        path = connection_manager.DATABASE_PATH
+    with connection_manager.using_database(os.path.abspath(path)):
+        controller.create_database(10)  # Not executed if database already exists
+        server = HabitTrackerServer((host, port), HabitRequestHandler, workers)
+        server.verbose = verbose
+        print(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} Serving {path} on http://{host}:{server.server_port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+
+def main(arguments=None):
+    """
+    Command line interface of the JSON service.
+
+    Example usage:
+    - python server.py --port 8000 --database habit_tracker.db
+
+    Args:
+        arguments (list, optional): The command line arguments, defaults to sys.argv.
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Serves the habit tracker as JSON service.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8000, help="port to listen on (default: 8000)")
+    parser.add_argument("--database", help="database file to serve (default: habit_tracker.db)")
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS,
+                        help=f"number of request handling threads (default: {SERVER_WORKERS})")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    options = parser.parse_args(arguments)
+    run_server(options.host, options.port, options.database, options.workers, options.verbose)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import contextlib
+import os
+import re
+import threading
+import connection_manager
+import migrations
+
+# Directory holding one database file per tenant (user)
+TENANT_DIRECTORY = "tenants"
+
+# Tenant IDs are used as file names, so only a restricted set of characters is allowed
+TENANT_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+# Database files that were already checked to exist with the current schema during this process
+initialized_paths = set()
+initialized_paths_lock = threading.Lock()
+
+# Held while a tenant database is created or upgraded
+initialization_lock = threading.Lock()
+
+
+def get_tenant_path(tenant_ID):
+    """
+    Returns the path of the database file of a tenant.
+
+    Args:
+        tenant_ID (str): The ID of the tenant, consisting of letters, digits, "_" and "-" only.
+
+    Returns:
+        str: The path of the database file of the tenant.
+
+    Raises:
+        ValueError: If the tenant ID is not a string, contains other characters or is too long.
+    """
+    if not isinstance(tenant_ID, str) or not TENANT_ID_PATTERN.fullmatch(tenant_ID):
+        raise ValueError(f"Invalid tenant ID {tenant_ID!r}")
+    return os.path.abspath(os.path.join(TENANT_DIRECTORY, f"{tenant_ID}.db"))
+
+
+@contextlib.contextmanager
+def using_tenant(tenant_ID):
+    """
+    Context manager that routes all controller and database calls within it to the database file of the given tenant.
+    The database of a new tenant is created on first use.
+
+    Connections to the tenant databases are kept in the process-wide LRU of connection_manager
+    (MAX_OPEN_CONNECTIONS), which closes them once they are idle after the context has ended, so any number of tenants
+    can be served by any number of threads without running out of file handles.
+
+    Args:
+        tenant_ID (str): The ID of the tenant, see get_tenant_path.
+
+    Example usage:
+    - with using_tenant("alice"):
+          controller.complete_habit("Daily Exercise")
+    """
+    path = get_tenant_path(tenant_ID)
+    with connection_manager.using_database(path):
+        with initialized_paths_lock:
+            initialized = path in initialized_paths
+        if not initialized:
+            # Initializing one database at a time, since concurrent first connections to a new database file can fail
+            # to switch it to WAL mode
+            with initialization_lock:
+                if path not in initialized_paths:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    migrations.initialize_database()
+                    with initialized_paths_lock:
+                        initialized_paths.add(path)
+        yield path
+
+
+def list_tenants():
+    """
+    Lists the tenants that have a database file.
+
+    Returns:
+        list: The IDs of all tenants, sorted.
+    """
+    if not os.path.isdir(TENANT_DIRECTORY):
+        return []
+    return sorted(file_name[:-3] for file_name in os.listdir(TENANT_DIRECTORY)
+                  if file_name.endswith(".db") and TENANT_ID_PATTERN.fullmatch(file_name[:-3]))
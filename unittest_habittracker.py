@@ -1,9 +1,58 @@
+import asyncio
+import contextvars
+import csv
+import datetime
+import http.client
+import json
+import os
 import sqlite3 as sql
+import tempfile
+import threading
 import unittest
+import unittest.mock
+import urllib.parse
+import async_controller
+import background_worker
+import connection_manager
+import habit_cache
+import tenants
+from analytics import advance_habit_statistics
+from analytics import calculate_habit_statistics
+from analytics import calculate_habit_statistics_from_rollups
+from analytics import datetime_to_timestamp
+from analytics import SECONDS_PER_DAY
+from analytics import SECONDS_PER_WEEK
+from analytics import WEEK_OFFSET
+from analytics import select_valid_completions
+from benchmark import run_benchmarks
+from controller import create_database
+from database import HABIT_SORT_KEYS
+from database import STATISTICS_PROVIDERS
+from database import create_tables
+from database import sql_check_if_habit_already_completed
+from database import sql_complete_habit
+from database import sql_complete_habit_by_ID
+from database import sql_create_habit
+from database import sql_delete_habit
 from database import sql_get_days_since_completion
 from database import sql_get_latest_streak
 from database import sql_get_longest_streak
 from database import sql_get_number_of_breaks
+from database import sql_get_habit_ID
+from database import sql_get_stale_habit_IDs
+from database import sql_query_habits
+from database import sql_return_habit
+from database import sql_return_habit_list
+from database import update_stale_habits
+from database import update_database
+from data_export import export_database
+from data_export import open_data_file
+from data_import import import_executions
+from dataset_generator import generate_database
+from migrations import apply_migrations
+from parallel_recompute import recompute_database
+from server import HabitRequestHandler
+from server import HabitTrackerServer
 
 
 def check_database():
@@ -49,22 +98,18 @@ def check_database():
 # Assessing data stored in database
 def get_habit_rows():
     """
-    Retrieves all rows from the Habit table in the habit_tracker.db database.
+    Retrieves all rows from the Habit table of the current database (see connection_manager.using_database).
 
-    This function connects to the database, executes a query to retrieve all the rows from the Habit table,
+    This function uses the shared database connection, executes a query to retrieve all the rows from the Habit table,
     and returns the result.
 
-    Note:
-    The function assumes that the database file "habit_tracker.db" exists in the current directory. If there is no
-    database, it is required to run the habit tracker application for the first time. This will create the database.
-
     Returns:
     list: A list of tuples representing the rows retrieved from the Habit table.
           Each tuple contains the following columns: (HabitID, Name, Periodicity, DaysSinceLastExecution,
           CurrentStreak, LongestSteak, BreakCount).
     """
-    # Connecting to the database
-    conn = sql.connect("habit_tracker.db")
+    # Retrieving the shared database connection
+    conn = connection_manager.get_connection()
 
     # Creating a cursor
     cursor = conn.cursor()
@@ -73,6 +118,9 @@ def get_habit_rows():
     cursor.execute("SELECT * FROM Habit")
     habit_rows = cursor.fetchall()
 
+    # Closing the cursor
+    cursor.close()
+
     return habit_rows
 
 
@@ -122,10 +170,48 @@ def get_numbers_from_single_record(habit_record):
     return days_since_last_execution, current_streak, longest_streak, break_count
 
 
+def use_temporary_database(test_case):
+    """
+    Creates a sample database (see controller.create_database) in a temporary directory and routes all database
+    functions to it until the end of the test. The directory is removed again after the test.
+
+    Args:
+    - test_case (unittest.TestCase): The running test case.
+
+    Returns:
+    tuple: The temporary directory and the path of the sample database in it.
+    """
+    temporary_directory = tempfile.TemporaryDirectory()
+    test_case.addCleanup(temporary_directory.cleanup)
+    database_path = os.path.join(temporary_directory.name, "habit_tracker.db")
+    test_case.enterContext(connection_manager.using_database(database_path))
+    test_case.addCleanup(connection_manager.close_connections, database_path)
+    create_database(10)
+    return temporary_directory.name, database_path
+
+
+class StubTkRoot:
+    """
+    Stands in for the Tk root of a background_worker.BackgroundWorker. The callbacks scheduled with after() are only
+    run by run_callbacks, synchronously on the calling thread.
+    """
+
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, milliseconds, callback):
+        self.callbacks.append(callback)
+
+    def run_callbacks(self):
+        while self.callbacks:
+            self.callbacks.pop(0)()
+
+
 class TestCase(unittest.TestCase):
     def setUp(self):
         """
-        Set up the test case by initializing the necessary variables.
+        Set up the test case by creating a sample database in a temporary directory (see use_temporary_database) and
+        initializing the necessary variables.
 
         This method is called before each test method in the TestCase class. It sets up the required variables for
         performing the tests.
@@ -155,6 +241,7 @@ class TestCase(unittest.TestCase):
           get_habit_record.
           These numbers represent DaysSinceLastExecution, CurrentStreak, LongestStreak, and BreakCount.
         """
+        use_temporary_database(self)
 
         self.one_days_since_last_execution, self.one_current_streak, self.one_longest_streak, self.one_break_count \
             = get_numbers_from_single_record(get_habit_record(1))
@@ -305,7 +392,647 @@ class TestCase(unittest.TestCase):
         self.assertEqual(self.five_break_count,
                          sql_get_number_of_breaks(5))
 
-if __name__ == "__main__":
-    unittest.main()
+    def test_incremental_statistics(self):
+        """
+        Test case for the "advance_habit_statistics" function from the analytics module.
+
+        This test case verifies that advancing the statistics of a habit execution by execution leads to the same
+        current streak, longest streak and number of breaks as calculating them from the whole execution history with
+        the "calculate_habit_statistics" function. The execution history contains gaps shorter and longer than the
+        daily and weekly streak limits.
+        """
+        start = datetime.datetime(2023, 1, 2, 8, 0, 0)
+        gaps_in_hours = [0, 24, 30, 47, 49, 24, 200, 24, 24, 170, 24, 72]
+        execution_dates = []
+        for gap in gaps_in_hours:
+            start += datetime.timedelta(hours=gap)
+            execution_dates.append(datetime_to_timestamp(start))
+
+        for periodicity in ("daily", "weekly"):
+            current_streak, longest_streak, number_of_breaks = 0, 0, 0
+            previous_completion = None
+            for execution_date in execution_dates:
+                current_streak, longest_streak, number_of_breaks = advance_habit_statistics(
+                    periodicity, current_streak, longest_streak, number_of_breaks, previous_completion,
+                    execution_date)
+                previous_completion = execution_date
+            self.assertEqual((current_streak, longest_streak, number_of_breaks),
+                             calculate_habit_statistics(periodicity, execution_dates, execution_dates[-1])[2:5])
+
+    def test_rollup_statistics(self):
+        """
+        Test case for the "calculate_habit_statistics_from_rollups" function from the analytics module.
+
+        This test case verifies that the statistics calculated from the executions of a weekly habit grouped per ISO
+        week, like in the HabitExecutionWeekly rollup, are the same as the ones calculated from the single executions
+        with the "calculate_habit_statistics" function. The same holds for the executions of a daily habit grouped per
+        day, the shortest period the function accepts. The execution history contains several executions on the same
+        day.
+        """
+        start = datetime.datetime(2023, 1, 2, 8, 0, 0)
+        gaps_in_hours = [0, 2, 3, 24, 30, 47, 49, 1, 24, 200, 24, 5, 24, 170, 24, 72, 4]
+        execution_dates = []
+        for gap in gaps_in_hours:
+            start += datetime.timedelta(hours=gap)
+            execution_dates.append(datetime_to_timestamp(start))
+        now = execution_dates[-1] + 3600
+
+        for periodicity, period_length, offset in (("daily", SECONDS_PER_DAY, 0),
+                                                   ("weekly", SECONDS_PER_WEEK, WEEK_OFFSET)):
+            rollups = {}
+            for execution_date in execution_dates:
+                count, first, last = rollups.get((execution_date + offset) // period_length, (0, execution_date, 0))
+                rollups[(execution_date + offset) // period_length] = (count + 1, first, execution_date)
+            periods = [rollups[period] for period in sorted(rollups)]
+            with self.subTest(periodicity=periodicity):
+                self.assertEqual(calculate_habit_statistics(periodicity, execution_dates, now),
+                                 calculate_habit_statistics_from_rollups(periodicity, periods, now))
+
+    def test_valid_completions(self):
+        """
+        Test case for the "select_valid_completions" function from the analytics module.
+
+        This test case verifies that completions less than a day away from an existing execution or from another
+        accepted completion of the batch are rejected, and that all other completions are accepted.
+        """
+        day = 86400
+        existing_timestamps = [10 * day, 20 * day]
+        new_timestamps = [21 * day, 5 * day, 10 * day + 3600, 5 * day + 7200, 15 * day, 20 * day - 1]
+        self.assertEqual(([5 * day, 15 * day, 21 * day], [5 * day + 7200, 10 * day + 3600, 20 * day - 1]),
+                         select_valid_completions(existing_timestamps, new_timestamps))
+
+    def test_background_worker(self):
+        """
+        Test case for the coalescing and cancelling of jobs by the BackgroundWorker class from the background_worker
+        module.
+
+        This test case verifies that an identical job only replaces the callbacks of the outstanding one, that a
+        different job with the same key discards the outcome of the outstanding one whether it is running or not,
+        that cancelled jobs deliver nothing and that exceptions are passed to the error callback.
+        """
+        root = StubTkRoot()
+        worker = background_worker.BackgroundWorker(root)
+        started, release = threading.Event(), threading.Event()
+        results = []
+
+        def block():
+            started.set()
+            release.wait(5)
+            return "running"
+
+        worker.submit("running", block, callback=lambda result: results.append(("superseded running", result)))
+        started.wait(5)
+        worker.submit("running", pow, 2, 1, callback=lambda result: results.append(("running", result)))
+        job = worker.submit("page", pow, 2, 2, callback=lambda result: results.append(("replaced", result)))
+        self.assertIs(job, worker.submit("page", pow, 2, 2, callback=lambda result: results.append(("page", result))))
+        worker.submit("table", pow, 2, 3, callback=lambda result: results.append(("superseded table", result)))
+        worker.submit("table", pow, 2, 4, callback=lambda result: results.append(("table", result)))
+        worker.submit("cancelled", pow, 2, 5, callback=lambda result: results.append(("cancelled", result)))
+        worker.cancel("cancelled")
+        worker.submit("error", int, "x", error_callback=lambda exception: results.append(("error", type(exception))))
+
+        release.set()
+        worker.executor.shutdown(wait=True)
+        root.run_callbacks()
+        self.assertEqual([("running", 2), ("page", 4), ("table", 16), ("error", ValueError)], results)
+        self.assertEqual({}, worker.jobs)
+        self.assertFalse(worker.polling)
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """
+    Test cases that need a database of their own. Every test runs against a new sample database in a temporary
+    directory (see connection_manager.using_database), so that habit_tracker.db is neither read nor changed.
+    """
+
+    def setUp(self):
+        """
+        Set up the test case by creating a sample database in a temporary directory (see use_temporary_database).
+        """
+        self.directory, self.database_path = use_temporary_database(self)
+
+    def test_statistics_providers(self):
+        """
+        Test case for the statistics providers used by the "update_database" function from the database module.
+
+        This test case verifies that every provider in STATISTICS_PROVIDERS calculates the same days since last
+        completion, current streak, longest streak, number of breaks and latest execution for every habit in the
+        database as the Python implementation.
+        """
+        now = datetime.datetime.now()
+        expected_rows = sorted(STATISTICS_PROVIDERS["python"](now), key=lambda row: row[-1])
+        for provider, calculate_statistics in STATISTICS_PROVIDERS.items():
+            with self.subTest(provider=provider):
+                self.assertEqual(expected_rows, sorted(calculate_statistics(now), key=lambda row: row[-1]))
+
+    def test_complete_habit(self):
+        """
+        Test case for the "sql_check_if_habit_already_completed" and "sql_complete_habit" functions from the database
+        module.
+
+        This test case verifies that a new habit can be completed once a day and that its statistics are advanced by
+        the completion.
+        """
+        sql_create_habit("Unittest Completed Habit", "daily")
+        self.assertTrue(sql_check_if_habit_already_completed("Unittest Completed Habit"))
+        self.assertTrue(sql_complete_habit("unittest completed habit"))
+        self.assertFalse(sql_check_if_habit_already_completed("Unittest Completed Habit"))
+        self.assertFalse(sql_complete_habit("Unittest Completed Habit"))
+        self.assertEqual((0, 1, 1, 0), sql_return_habit("Unittest Completed Habit")[3:7])
+
+    def test_complete_habit_after_deleting_executions(self):
+        """
+        Test case for the "sql_complete_habit_by_ID" function from the database module.
+
+        This test case verifies that completing a habit whose executions were all deleted starts its statistics anew
+        instead of advancing the outdated ones stored in the Habit table.
+        """
+        habit_ID = sql_get_habit_ID("Daily Exercise")
+        self.assertNotEqual((1, 1, 0), sql_return_habit("Daily Exercise")[4:7])
+
+        conn = connection_manager.get_connection()
+        conn.execute("DELETE FROM HabitExecution WHERE HabitID = ?", (habit_ID,))
+        conn.commit()
+
+        self.assertTrue(sql_complete_habit_by_ID(habit_ID))
+        self.assertEqual((0, 1, 1, 0), sql_return_habit("Daily Exercise")[3:7])
+
+    def test_stale_habits(self):
+        """
+        Test case for the "sql_get_stale_habit_IDs" and "update_stale_habits" functions from the database module.
+
+        This test case verifies that a new habit is stale until its statistics are calculated, that inserting or
+        deleting an execution marks the habit stale again, and that the habit becomes stale once another full day has
+        passed since its last completion, as its days since the last completion change.
+        """
+        now = datetime.datetime.now().replace(microsecond=0)
+        self.assertEqual([], sql_get_stale_habit_IDs(now))
+
+        sql_create_habit("Unittest Stale Habit", "daily")
+        habit_ID = sql_get_habit_ID("Unittest Stale Habit")
+        self.assertEqual([habit_ID], sql_get_stale_habit_IDs(now))
+        self.assertEqual(1, update_stale_habits())
+        self.assertEqual([], sql_get_stale_habit_IDs(now))
+
+        conn = connection_manager.get_connection()
+        completion = (now - datetime.timedelta(hours=1)).strftime("%Y-%m-%d %H:%M:%S")
+        for statement in ["INSERT INTO HabitExecution (HabitID, DateTime) VALUES (?, ?)",
+                          "DELETE FROM HabitExecution WHERE HabitID = ? AND DateTime = ?",
+                          "INSERT INTO HabitExecution (HabitID, DateTime) VALUES (?, ?)"]:
+            with self.subTest(statement=statement):
+                conn.execute(statement, (habit_ID, completion))
+                conn.commit()
+                self.assertEqual([habit_ID], sql_get_stale_habit_IDs(now))
+                self.assertEqual(1, update_stale_habits())
+                self.assertEqual([], sql_get_stale_habit_IDs(now))
+
+        self.assertNotIn(habit_ID, sql_get_stale_habit_IDs(now + datetime.timedelta(hours=22, minutes=59)))
+        self.assertIn(habit_ID, sql_get_stale_habit_IDs(now + datetime.timedelta(hours=23)))
+
+    def test_habit_query_pages(self):
+        """
+        Test case for the keyset pagination of the "sql_query_habits" function from the database module.
+
+        This test case verifies that reading a habit list page by page returns the same rows in the same order as
+        reading it at once, for every sort key and direction.
+        """
+        for sort_key in HABIT_SORT_KEYS:
+            for descending in (False, True):
+                with self.subTest(sort_key=sort_key, descending=descending):
+                    expected_rows, next_page = sql_query_habits(sort_key=sort_key, descending=descending)
+                    self.assertIsNone(next_page)
+                    rows = []
+                    while True:
+                        page, next_page = sql_query_habits(sort_key=sort_key, descending=descending, limit=2,
+                                                           after=next_page)
+                        rows.extend(page)
+                        if next_page is None:
+                            break
+                    self.assertEqual(expected_rows, rows)
+
+    def test_habit_cache(self):
+        """
+        Test case for the habit cache used by the "sql_return_habit_list" and "sql_return_habit" functions from the
+        database module.
+
+        This test case verifies that a created habit appears in the cached habit names and can be retrieved under any
+        spelling of its name, and that it disappears from the cached habit names once it is deleted.
+        """
+        habit_name = "Unittest Cached Habit"
+        sql_return_habit_list()
+        sql_create_habit(habit_name, "daily")
+        try:
+            self.assertIn(habit_name, sql_return_habit_list())
+            self.assertEqual(sql_return_habit(habit_name), sql_return_habit(habit_name.upper()))
+        finally:
+            sql_delete_habit(habit_name)
+        self.assertNotIn(habit_name, sql_return_habit_list())
 
+    def test_habit_cache_invalidation(self):
+        """
+        Test case for the generations and the eviction of the habit_cache module.
+
+        This test case verifies that data read before an invalidation is not stored in the cache afterwards, and that
+        the least recently used habit IDs are evicted once the cache is full.
+        """
+        habit_row = sql_return_habit("Weekly Meditation")
+        generation = habit_cache.get_generation()
+        habit_cache.invalidate_habits(habit_ID=habit_row[0])
+        habit_cache.store_habit(habit_row, generation)
+        habit_cache.store_habit_ID("Weekly Meditation", habit_row[0], generation)
+        self.assertIsNone(habit_cache.get_habit("Weekly Meditation"))
+        self.assertIsNone(habit_cache.get_habit_ID("Weekly Meditation"))
+
+        with unittest.mock.patch.object(habit_cache, "HABIT_CACHE_SIZE", 2):
+            habit_cache.clear()
+            generation = habit_cache.get_generation()
+            habit_cache.store_habit_ID("First", 1, generation)
+            habit_cache.store_habit_ID("Second", 2, generation)
+            self.assertEqual(1, habit_cache.get_habit_ID("first"))
+            habit_cache.store_habit_ID("Third", 3, generation)
+            self.assertEqual([1, None, 3], [habit_cache.get_habit_ID(name) for name in ("First", "Second", "Third")])
+            habit_cache.clear()
+
+    def test_duplicate_habit_names(self):
+        """
+        Test case for the "sql_create_habit" function from the database module.
+
+        This test case verifies that a habit cannot be created a second time under the same name, regardless of case.
+        """
+        habit_name = "Unittest Duplicate Habit"
+        self.assertTrue(sql_create_habit(habit_name, "weekly"))
+        try:
+            self.assertFalse(sql_create_habit(habit_name.lower(), "daily"))
+            self.assertEqual(1, [name.upper() for name in sql_return_habit_list()].count(habit_name.upper()))
+        finally:
+            sql_delete_habit(habit_name)
+
+    def test_habit_name_index_migration(self):
+        """
+        Test case for the "create_habit_name_index" migration from the migrations module.
+
+        This test case verifies that habits of an old database whose names only differ in the case of ASCII letters
+        are merged into the oldest of them, including their executions, while names that only differ in the case of
+        non-ASCII letters are kept apart.
+        """
+        path = os.path.join(self.directory, "old_habit_tracker.db")
+        self.addCleanup(connection_manager.close_connections, path)
+        with connection_manager.using_database(path):
+            conn = connection_manager.get_connection()
+            cursor = conn.cursor()
+            create_tables(cursor)
+            cursor.executemany("INSERT INTO Habit (ID, HabitName, Periodicity) VALUES (?, ?, ?)",
+                               [(1, "Yoga", "daily"), (2, "YOGA", "weekly"), (3, "Ärger", "daily"),
+                                (4, "ärger", "daily")])
+            cursor.executemany("INSERT INTO HabitExecution (HabitID, DateTime) VALUES (?, ?)",
+                               [(1, "2024-01-01 08:00:00"), (1, "2024-01-02 08:00:00"), (2, "2024-01-02 08:00:00"),
+                                (2, "2024-01-03 08:00:00")])
+            conn.commit()
+            apply_migrations(conn)
+
+            cursor.execute("SELECT ID, HabitName, Periodicity FROM Habit ORDER BY ID")
+            self.assertEqual([(1, "Yoga", "daily"), (3, "Ärger", "daily"), (4, "ärger", "daily")], cursor.fetchall())
+            cursor.execute("SELECT HabitID, DateTime FROM HabitExecution ORDER BY DateTime")
+            self.assertEqual([(1, "2024-01-01 08:00:00"), (1, "2024-01-02 08:00:00"), (1, "2024-01-03 08:00:00")],
+                             cursor.fetchall())
+            cursor.close()
+            self.assertFalse(sql_create_habit("yoga", "daily"))
+
+    def test_execution_timestamp_migration(self):
+        """
+        Test case for the "add_execution_timestamp_column" migration from the migrations module.
+
+        This test case verifies that the executions of an old database get the integer timestamp of their DateTime,
+        and that executions inserted afterwards with DateTime only get their timestamp from the trigger.
+        """
+        path = os.path.join(self.directory, "old_habit_tracker.db")
+        self.addCleanup(connection_manager.close_connections, path)
+        with connection_manager.using_database(path):
+            conn = connection_manager.get_connection()
+            cursor = conn.cursor()
+            create_tables(cursor)
+            cursor.execute("INSERT INTO Habit (ID, HabitName, Periodicity) VALUES (1, 'Yoga', 'daily')")
+            cursor.executemany("INSERT INTO HabitExecution (HabitID, DateTime) VALUES (1, ?)",
+                               [("2024-01-01 08:00:00",), ("2024-02-29 23:59:59",)])
+            conn.commit()
+            apply_migrations(conn)
+
+            cursor.execute("INSERT INTO HabitExecution (HabitID, DateTime) VALUES (1, '2024-03-01 07:30:00')")
+            conn.commit()
+            cursor.execute("SELECT DateTime, Timestamp FROM HabitExecution ORDER BY DateTime")
+            self.assertEqual([(date_time, datetime_to_timestamp(datetime.datetime.fromisoformat(date_time)))
+                              for date_time in ["2024-01-01 08:00:00", "2024-02-29 23:59:59", "2024-03-01 07:30:00"]],
+                             cursor.fetchall())
+            cursor.close()
+
+    def test_dataset_generator(self):
+        """
+        Test case for the "generate_database" function from the dataset_generator module.
+
+        This test case verifies that a generated database contains the requested number of habits, that the same seed
+        produces the same executions, that daily habits of the "weekdays" pattern are never completed on weekends,
+        that the stored statistics match a recalculation and that an existing database is only replaced on request.
+        """
+        paths = [os.path.join(self.directory, f"generated_{number}.db") for number in range(2)]
+        end_date = datetime.date(2024, 6, 30)
+        for path in paths:
+            summary = generate_database(path, habit_count=20, years=0.5, gap_pattern="weekdays", seed=7,
+                                        end_date=end_date)
+            self.assertEqual(20, summary["habits"])
+            self.addCleanup(connection_manager.close_connections, path)
+
+        executions = []
+        for path in paths:
+            with connection_manager.using_database(path):
+                cursor = connection_manager.get_connection().cursor()
+                cursor.execute('''SELECT h.HabitName, h.Periodicity, e.DateTime FROM HabitExecution e
+                               JOIN Habit h ON h.ID = e.HabitID ORDER BY h.ID, e.Timestamp''')
+                executions.append(cursor.fetchall())
+                cursor.execute("SELECT CurrentStreak, LongestStreak, NumberOfBreaks, ID FROM Habit ORDER BY ID")
+                stored_statistics = cursor.fetchall()
+                cursor.close()
+                self.assertEqual(stored_statistics,
+                                 sorted((row[1:4] + row[5:] for row in STATISTICS_PROVIDERS["python"](
+                                     datetime.datetime.now())), key=lambda row: row[-1]))
+        self.assertEqual(executions[0], executions[1])
+        self.assertTrue(executions[0])
+        self.assertFalse([execution for execution in executions[0] if execution[1] == "daily"
+                          and datetime.datetime.fromisoformat(execution[2]).weekday() >= 5])
+
+        with self.assertRaises(FileExistsError):
+            generate_database(paths[0], habit_count=1)
+        self.assertEqual(1, generate_database(paths[0], habit_count=1, overwrite=True)["habits"])
+
+    def test_benchmark(self):
+        """
+        Test case for the "run_benchmarks" function from the benchmark module.
+
+        This test case runs the benchmark suite once on a small database and verifies that every hot path was timed
+        and that the generated database is kept in the given directory.
+        """
+        report = run_benchmarks([(5, 0.1)], repeat=1, directory=self.directory)
+        path = os.path.join(self.directory, "benchmark_5_habits_0.1_years.db")
+        self.addCleanup(connection_manager.close_connections, path)
+
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(1, len(report["results"]))
+        result = report["results"][0]
+        self.assertEqual(5, result["habits"])
+        self.assertGreater(result["executions"], 0)
+        for name in ["update_database[python]", "give_habit_list_by_ID[all stale]", "complete_habit",
+                     "create_daily_habit[duplicate]", "sql_delete_habit"]:
+            self.assertEqual(1, result["timings"][name]["repeat"])
+
+        # The habits created by the benchmark are deleted again
+        with connection_manager.using_database(path):
+            self.assertEqual(5, len(sql_return_habit_list()))
+
+    def test_async_controller(self):
+        """
+        Test case for the async_controller module.
+
+        This test case creates and completes habits with concurrent calls (see asyncio.gather) and verifies that every
+        habit is created and completed exactly once, even if the same habit is created or completed twice at the same
+        time.
+        """
+        self.addCleanup(async_controller.shutdown_executor)
+        habit_names = [f"Unittest Async Habit {number}" for number in range(8)]
+
+        async def create_and_complete_habits():
+            duplicates = await asyncio.gather(*[async_controller.create_daily_habit(name) for name in habit_names],
+                                              async_controller.create_daily_habit(habit_names[0].upper()))
+            completions = await asyncio.gather(*[async_controller.complete_habit(name) for name in habit_names],
+                                               async_controller.complete_habit(habit_names[0]))
+            habit_page, next_page = await async_controller.give_habit_page(sort_key="CurrentStreak", descending=True)
+            return duplicates, completions, habit_page
+
+        duplicates, completions, habit_page = asyncio.run(create_and_complete_habits())
+
+        self.assertEqual(1, duplicates.count(True))
+        self.assertEqual([False] * 7, duplicates[1:-1])
+        self.assertEqual(1, completions.count(False))
+        self.assertEqual([True] * 7, completions[1:-1])
+        habit_rows = {row[1].upper(): row for row in habit_page}
+        for name in habit_names:
+            self.assertEqual(("daily", 0, 1, 1, 0), habit_rows[name.upper()][2:])
+
+    def test_server(self):
+        """
+        Test case for the JSON service of the server module.
+
+        This test case runs the service on an ephemeral port and verifies the responses of its endpoints, including
+        invalid requests (400), unknown habits and paths (404) and duplicate habits and completions (409). It also
+        verifies that idle clients do not occupy the request handling threads.
+        """
+        server = HabitTrackerServer(("127.0.0.1", 0), HabitRequestHandler, workers=2)
+        server_thread = threading.Thread(target=contextvars.copy_context().run, args=(server.serve_forever,))
+        server_thread.start()
+        self.addCleanup(server_thread.join)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
 
+        def request(method, path, payload=None):
+            connection = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=5)
+            try:
+                body = None if payload is None else json.dumps(payload)
+                connection.request(method, path, body, {"Content-Type": "application/json"})
+                response = connection.getresponse()
+                content = response.read()
+                return response.status, json.loads(content) if content else None
+            finally:
+                connection.close()
+
+        habit_name = "Unittest Server Habit"
+        path = "/habits/" + urllib.parse.quote(habit_name)
+        self.assertEqual((201, {"name": habit_name, "periodicity": "daily"}),
+                         request("POST", "/habits", {"name": habit_name, "periodicity": "daily"}))
+        self.assertEqual(409, request("POST", "/habits", {"name": habit_name.lower(), "periodicity": "daily"})[0])
+        self.assertEqual(400, request("POST", "/habits", {"name": habit_name, "periodicity": "monthly"})[0])
+        self.assertEqual(400, request("POST", "/habits", {"periodicity": "daily"})[0])
+        self.assertIn(habit_name, request("GET", "/habits")[1]["habits"])
+
+        self.assertEqual(201, request("POST", path + "/completions")[0])
+        self.assertEqual(409, request("POST", path + "/completions")[0])
+        self.assertEqual(404, request("POST", "/habits/Unknown%20Habit/completions")[0])
+        status, page = request("GET", "/habits/page?sort_key=CurrentStreak&descending=true&limit=100")
+        self.assertEqual(200, status)
+        self.assertIn([habit_name, 1], [[habit["HabitName"], habit["CurrentStreak"]] for habit in page["habits"]])
+        self.assertEqual(400, request("GET", "/habits/page?sort_key=Unknown")[0])
+        self.assertEqual(200, request("GET", "/analytics/by_longest_streak")[0])
+        self.assertEqual(404, request("GET", "/analytics/unknown")[0])
+
+        # Idle clients, which keep their connections open, do not block the requests of further clients
+        idle_connections = [http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=5) for _ in range(2)]
+        for connection in idle_connections:
+            self.addCleanup(connection.close)
+            connection.request("GET", "/habits")
+            self.assertEqual("close", connection.getresponse().getheader("Connection"))
+        self.assertEqual(200, request("GET", "/habits")[0])
+
+        self.assertEqual((204, None), request("DELETE", path))
+        self.assertEqual(404, request("DELETE", path)[0])
+        self.assertEqual(404, request("GET", "/unknown")[0])
+
+    def test_tenants(self):
+        """
+        Test case for the tenants module.
+
+        This test case verifies that every tenant works on a database of its own, which is created without sample
+        data on first use, and that invalid tenant IDs are rejected.
+        """
+        tenant_directory = os.path.join(self.directory, "tenants")
+        self.enterContext(unittest.mock.patch.object(tenants, "TENANT_DIRECTORY", tenant_directory))
+        with tenants.using_tenant("alice") as path:
+            self.addCleanup(connection_manager.close_connections, path)
+            self.assertEqual(os.path.join(tenant_directory, "alice.db"), path)
+            self.assertEqual([], sql_return_habit_list())
+            self.assertTrue(sql_create_habit("Unittest Tenant Habit", "daily"))
+        with tenants.using_tenant("bob") as path:
+            self.addCleanup(connection_manager.close_connections, path)
+            self.assertEqual([], sql_return_habit_list())
+        with tenants.using_tenant("alice"):
+            self.assertEqual(["Unittest Tenant Habit"], sql_return_habit_list())
+        self.assertNotIn("Unittest Tenant Habit", sql_return_habit_list())
+        self.assertEqual(["alice", "bob"], tenants.list_tenants())
+
+        for tenant_ID in ["", "../alice", "alice.db", "a" * 65, None]:
+            with self.subTest(tenant_ID=tenant_ID):
+                with self.assertRaises(ValueError):
+                    tenants.get_tenant_path(tenant_ID)
+
+    def test_connection_limit(self):
+        """
+        Test case for the process-wide connection limit of the connection_manager module.
+
+        This test case lets several threads work on more tenants than MAX_OPEN_CONNECTIONS and verifies that the idle
+        connections of all threads are closed, while the connections in use stay open.
+        """
+        tenant_directory = os.path.join(self.directory, "tenants")
+        self.enterContext(unittest.mock.patch.object(tenants, "TENANT_DIRECTORY", tenant_directory))
+        self.enterContext(unittest.mock.patch.object(connection_manager, "MAX_OPEN_CONNECTIONS", 6))
+        connection = connection_manager.get_connection()
+        open_connection_counts = []
+
+        def use_tenants(thread_number):
+            for tenant_number in range(10):
+                with tenants.using_tenant(f"tenant_{thread_number}_{tenant_number}"):
+                    sql_return_habit_list()
+                    open_connection_counts.append(len(connection_manager.open_connections))
+
+        threads = [threading.Thread(target=contextvars.copy_context().run, args=(use_tenants, thread_number))
+                   for thread_number in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(40, len(tenants.list_tenants()))
+        self.assertLessEqual(max(open_connection_counts), 6)
+        self.assertIs(connection, connection_manager.get_connection())
+
+    def test_parallel_recompute(self):
+        """
+        Test case for the "recompute_database" function from the parallel_recompute module.
+
+        This test case verifies that recalculating the statistics in chunks on worker processes stores the same
+        statistics as the "update_database" function from the database module, and that all habits are up to date
+        afterwards.
+        """
+        connection = connection_manager.get_connection()
+        statistics_query = '''SELECT ID, DaysSinceLastCompletion, CurrentStreak, LongestStreak, NumberOfBreaks,
+                           LastCompletion FROM Habit ORDER BY ID'''
+        update_database()
+        expected_statistics = connection.execute(statistics_query).fetchall()
+        connection.execute("UPDATE Habit SET CurrentStreak = -1, LongestStreak = -1, NumberOfBreaks = -1")
+        connection.commit()
+
+        self.assertEqual(len(expected_statistics), recompute_database(self.database_path, workers=2, chunk_size=2))
+        self.assertEqual(expected_statistics, connection.execute(statistics_query).fetchall())
+        self.assertEqual([], sql_get_stale_habit_IDs())
+
+    def test_data_import(self):
+        """
+        Test case for the "import_executions" function from the data_import module.
+
+        This test case verifies that missing habits are created, that executions which exist already in the file or
+        in the database are skipped, that the statistics of the imported habits are recalculated and that invalid
+        records are rejected. Importing into a new database file creates its tables without sample data.
+        """
+        habit_name = "Unittest Imported Habit"
+        path = os.path.join(self.directory, "executions.csv")
+        with open(path, "w", encoding="utf-8", newline="") as file:
+            file.write("HabitName,Periodicity,DateTime\n"
+                       f"{habit_name},weekly,2024-01-05 08:00:00\n"
+                       f"{habit_name},weekly,2024-01-05 08:00:00\n"
+                       f"{habit_name},weekly,2024-01-12 08:00:00\n"
+                       f"{habit_name.lower()},,2024-01-19 08:00:00\n")
+
+        summary = import_executions(path, batch_size=2)
+        self.assertEqual((4, 3, 1, [habit_name]),
+                         (summary["records"], summary["inserted"], summary["duplicates"], summary["created_habits"]))
+        habit_row = sql_return_habit(habit_name)
+        self.assertEqual((habit_name, "weekly"), habit_row[1:3])
+        self.assertEqual((3, 0), habit_row[5:7])
+
+        summary = import_executions(path)
+        self.assertEqual((4, 0, 4, []),
+                         (summary["records"], summary["inserted"], summary["duplicates"], summary["created_habits"]))
+
+        for record in ["Unittest Rejected Habit,daily,", "Unittest Rejected Habit,monthly,2024-01-05 08:00:00",
+                       ",daily,2024-01-05 08:00:00", "Unittest Rejected Habit,daily,yesterday"]:
+            with self.subTest(record=record):
+                with open(path, "w", encoding="utf-8", newline="") as file:
+                    file.write(f"HabitName,Periodicity,DateTime\n{habit_name},weekly,2024-01-26 08:00:00\n{record}\n")
+                with self.assertRaisesRegex(ValueError, "Record 2 of"):
+                    import_executions(path)
+                self.assertNotIn("Unittest Rejected Habit", sql_return_habit_list())
+
+        with open(path, "w", encoding="utf-8", newline="") as file:
+            file.write(f"HabitName,Timestamp\n{habit_name},1704441600\n")
+        new_database_path = os.path.join(self.directory, "imported.db")
+        self.addCleanup(connection_manager.close_connections, new_database_path)
+        with connection_manager.using_database(new_database_path):
+            self.assertEqual(1, import_executions(path)["inserted"])
+            self.assertEqual([(habit_name, "daily")], [sql_return_habit(name)[1:3] for name in sql_return_habit_list()])
+
+    def test_data_export(self):
+        """
+        Test case for the "export_database" function from the data_export module.
+
+        This test case verifies for every data format and compression that the exported files contain all habits and
+        executions, and that importing the executions file into a new database restores the same executions.
+        """
+        def read_executions():
+            cursor = connection_manager.get_connection().cursor()
+            cursor.execute('''SELECT h.HabitName, h.Periodicity, e.Timestamp FROM Habit h
+                           JOIN HabitExecution e ON e.HabitID = h.ID ORDER BY h.HabitName, e.Timestamp''')
+            executions = cursor.fetchall()
+            cursor.close()
+            return executions
+
+        executions = read_executions()
+        habit_names = sql_return_habit_list()
+        for data_format in ["csv", "jsonl"]:
+            for compression in [None, "gzip", "lzma"]:
+                with self.subTest(data_format=data_format, compression=compression):
+                    directory = os.path.join(self.directory, f"export-{data_format}-{compression}")
+                    summaries = export_database(directory, data_format, compression)
+                    self.assertEqual({"habits": len(habit_names), "executions": len(executions)},
+                                     {summary["table"]: summary["rows"] for summary in summaries})
+
+                    with open_data_file(summaries[0]["path"], "r", compression) as file:
+                        if data_format == "csv":
+                            rows = list(csv.DictReader(file))
+                        else:
+                            rows = [json.loads(line) for line in file]
+                    self.assertEqual(sorted(habit_names), sorted(row["HabitName"] for row in rows))
+
+                    new_database_path = os.path.join(directory, "imported.db")
+                    self.addCleanup(connection_manager.close_connections, new_database_path)
+                    with connection_manager.using_database(new_database_path):
+                        self.assertEqual(len(executions), import_executions(summaries[1]["path"])["inserted"])
+                        self.assertEqual(executions, read_executions())
+
+
+if __name__ == "__main__":
+    unittest.main()